@@ -0,0 +1,189 @@
+"""
+Benchmarks for odswriter, runnable offline with no extra dependencies.
+
+Each case writes a spreadsheet of a typical shape and reports rows/sec, bytes/sec, peak RSS and the time spent in
+close(). Every case runs in its own process, so that peak RSS belongs to that case alone.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json   # Exits with status 1 on a regression.
+"""
+import argparse
+import datetime
+import decimal
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import odswriter as ods  # noqa: E402
+from odswriter import backends  # noqa: E402
+
+
+def narrow_numeric(rows):
+    return [(None, None, ([i, i * 0.5, i * 3] for i in range(rows)))]
+
+
+def wide_mixed(rows):
+    date = datetime.date(2020, 1, 1)
+    when = datetime.datetime(2020, 1, 1, 12, 30)
+    row = ["Text", 1, 2.5, decimal.Decimal("3.25"), date, when, datetime.time(13, 37), True, None, "More & text"] * 4
+    return [(None, None, (row for _ in range(rows)))]
+
+
+def string_heavy(rows):
+    statuses = ["Open", "Closed", "Pending", "Cancelled"]
+    return [(None, None, (["Customer {}".format(i), statuses[i % 4], "GB", "A <longer> description of row {}".format(i),
+                           "Notes & comments"] for i in range(rows)))]
+
+
+def formula_heavy(rows):
+    return [(None, None, ([i, i + 1, ods.Formula("=A{0}*B{0}".format(i + 1)), ods.Formula("=SUM(A1:A{})".format(i + 1))]
+                          for i in range(rows)))]
+
+
+def many_sheets(rows):
+    sheets = 100
+    return [("Customer {}".format(s), None, (["Order {}".format(i), i, i * 1.5] for i in range(rows // sheets)))
+            for s in range(sheets)]
+
+
+def sparse(rows):
+    return [(None, 50, ([i] + [None] * 20 + ["x"] if i % 10 == 0 else [] for i in range(rows)))]
+
+
+CASES = {
+    "narrow_numeric": narrow_numeric,
+    "wide_mixed": wide_mixed,
+    "string_heavy": string_heavy,
+    "formula_heavy": formula_heavy,
+    "many_sheets": many_sheets,
+    "sparse": sparse,
+}
+
+MODES = {
+    "dom": {"backend": "minidom"},
+    "lxml": {"backend": "lxml"},
+    "streaming": {"streaming": True},
+}
+
+# Modes which can run here, lxml is optional.
+AVAILABLE_MODES = [mode for mode in sorted(MODES) if mode != "lxml" or backends.available("lxml")]
+
+
+class CountingFile(object):
+    """
+    Discards what is written to it, counting the bytes.
+    """
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def run_case(case, mode, rows):
+    out = CountingFile()
+    start = time.perf_counter()
+    odsfile = ods.writer(out, **MODES[mode])
+    for name, cols, sheet_rows in CASES[case](rows):
+        sheet = odsfile.new_sheet(name, cols)
+        sheet.writerows(sheet_rows)
+    close_start = time.perf_counter()
+    odsfile.close()
+    end = time.perf_counter()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024  # Linux reports kilobytes, macOS bytes.
+    return {
+        "rows_per_sec": rows / (end - start),
+        "bytes_per_sec": out.size / (end - start),
+        "bytes": out.size,
+        "peak_rss": peak_rss,
+        "time_to_close": end - close_start,
+        "seconds": end - start,
+    }
+
+
+def run_in_child(case, mode, rows):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", case, mode, str(rows)])
+    return json.loads(output.decode("utf-8"))
+
+
+def compare(results, baseline, tolerance):
+    """
+    :return: Descriptions of the regressions of results against baseline.
+    """
+    regressions = []
+    for key, result in sorted(results["results"].items()):
+        if key not in baseline["results"]:
+            continue
+        before = baseline["results"][key]
+        if result["rows_per_sec"] < before["rows_per_sec"] * (1 - tolerance):
+            regressions.append("{}: {:.0f} rows/sec, was {:.0f}".format(key, result["rows_per_sec"],
+                                                                        before["rows_per_sec"]))
+        if result["peak_rss"] > before["peak_rss"] * (1 + tolerance):
+            regressions.append("{}: peak RSS {:.1f}MiB, was {:.1f}MiB".format(key, result["peak_rss"] / 2 ** 20,
+                                                                              before["peak_rss"] / 2 ** 20))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark odswriter.")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows per case (default 20000).")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=AVAILABLE_MODES)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the fastest is kept (default 3).")
+    parser.add_argument("--output", help="Save the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare with results saved by --output and fail on a regression.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Fraction by which speed may drop or peak RSS may grow before it counts as a "
+                             "regression (default 0.2).")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        case, mode, rows = args.child
+        print(json.dumps(run_case(case, mode, int(rows))))
+        return 0
+
+    results = {"python": platform.python_version(), "rows": args.rows, "results": {}}
+    print("{:<32} {:>12} {:>12} {:>10} {:>10}".format("case", "rows/sec", "MiB/sec", "RSS MiB", "close s"))
+    for case in args.cases:
+        for mode in args.modes:
+            runs = [run_in_child(case, mode, args.rows) for _ in range(args.repeat)]
+            result = max(runs, key=lambda run: run["rows_per_sec"])
+            result["peak_rss"] = min(run["peak_rss"] for run in runs)
+            key = "{}/{}".format(case, mode)
+            results["results"][key] = result
+            print("{:<32} {:>12.0f} {:>12.2f} {:>10.1f} {:>10.3f}".format(
+                key, result["rows_per_sec"], result["bytes_per_sec"] / 2 ** 20, result["peak_rss"] / 2 ** 20,
+                result["time_to_close"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against {}:".format(args.baseline))
+            for regression in regressions:
+                print("  " + regression)
+            return 1
+        print("\nNo regressions against {}.".format(args.baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
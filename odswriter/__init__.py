@@ -1,19 +1,22 @@
 from __future__ import unicode_literals
 from zipfile import ZipFile, ZIP_STORED
-import decimal
-import datetime
-from xml.dom.minidom import parseString
+import time
 
 from . import ods_components
-from .formula import Formula
+from . import columnar
+from . import sources
+from .backends import BACKENDS, DEFAULT_BACKEND, LxmlDocument, MinidomDocument, cell_properties, qname
+from .formula import Formula, FormulaTemplate, formula_cache_info, set_formula_cache_size
+from .compression import open_member
+from .append import ODSAppender
+from .serializer import set_string_cache_size
+from .stats import WriterStats
+from .styles import Cell, Style, StyleRegistry
+from .streaming import ContentStream, FlatContentStream, StreamingSheet, ChunkBuffer, SPILL_THRESHOLD, BATCH_SIZE
+from .widths import ColumnStyles, ColumnWidths
 
 # Basic compatibility setup for Python 2 and Python 3.
 
-try:
-    long
-except NameError:
-    long = int
-
 try:
     unicode
 except NameError:
@@ -26,19 +29,85 @@ class ODSWriter(object):
     """
     Utility for writing OpenDocument Spreadsheets. Can be used in simple 1 sheet mode (use writerow/writerows) or with
     multiple sheets (use new_sheet). It is suggested that you use with object like a context manager.
+
+    With streaming=True, rows are serialised straight to XML and written into the compressed file as they arrive
+    instead of being built up in a DOM, so memory use stays flat however many rows are written. The output is
+    identical. Sheets can still be written to in any order: the first sheet is streamed straight into the file and the
+    others are buffered separately (in memory up to spill_threshold bytes each, then in temporary files) until close.
+    Streaming mode can also collapse_repeated cells and rows, which makes sparse or blank-heavy sheets much smaller,
+    and can serialise rows in a pool of worker processes. With workers, cell values must be picklable.
+
+    With compression=ZIP_DEFLATED, content.xml can be compressed on several threads by passing compress_threads.
+
+    Pass a WriterStats as stats to record counters and timings of the export.
+
+    With format="fods", a flat OpenDocument spreadsheet is written instead: a single uncompressed XML document, which
+    is always streamed. odsfile can then also be a text file. Styles must be added before the first sheet.
+
+    Without streaming, backend chooses how content.xml is built in memory, see odswriter.backends. The default is
+    "minidom", or the ODSWRITER_BACKEND environment variable when odswriter was imported.
+
+    With auto_width=True, columns are made wide enough for the longest value in them, which is tracked as rows are
+    written. In streaming mode, every sheet is then buffered until close, as the widths come before the rows.
     """
-    def __init__(self, odsfile, compression=ZIP_STORED):
+    def __init__(self, odsfile, compression=ZIP_STORED, streaming=False, spill_threshold=SPILL_THRESHOLD,
+                 collapse_repeated=False, workers=None, compress_threads=None, stats=None, format="ods", backend=None,
+                 auto_width=False):
+        if format not in ("ods", "fods"):
+            raise ValueError("Unknown format {!r}, expected 'ods' or 'fods'.".format(format))
+        if format == "fods":
+            streaming = True
+        if backend is not None and backend not in BACKENDS:
+            raise ValueError("Unknown backend {!r}, expected one of {}.".format(backend, ", ".join(BACKENDS)))
+        if backend is not None and streaming:
+            raise ValueError("A backend can only be chosen without streaming.")
+        if collapse_repeated and not streaming:
+            raise ValueError("Repeated cells can only be collapsed in streaming mode.")
+        if workers is not None and not streaming:
+            raise ValueError("Worker processes can only be used in streaming mode.")
+        self.format = format
+        self.streaming = streaming
+        self.backend = None if streaming else backend or DEFAULT_BACKEND
+        self.compress_threads = compress_threads
+        self.stats = stats
+        self.styles = StyleRegistry()
+        self.column_styles = ColumnStyles() if auto_width else None
+        self.default_sheet = None
+        self.sheets = []
+        self._sheets_by_name = {}
+        if format == "fods":
+            self.zipf = None
+            self.document = None
+            self.content = FlatContentStream(odsfile, self.styles, spill_threshold, collapse_repeated, workers, stats,
+                                             column_styles=self.column_styles)
+            return
+
         self.zipf = ZipFile(odsfile, "w", compression)
         # Make the skeleton of an ODS.
-        self.dom = parseString(ods_components.content_xml)
+        if streaming:
+            self.document = None
+            self.content = ContentStream(self.zipf, spill_threshold, collapse_repeated, workers, compress_threads,
+                                         stats, column_styles=self.column_styles)
+        elif self.backend == "lxml":
+            self.document = LxmlDocument()
+        else:
+            self.document = MinidomDocument()
+        # The mimetype must be stored uncompressed, so that it can be recognised at a fixed offset.
         self.zipf.writestr("mimetype",
-                           ods_components.mimetype.encode("utf-8"))
+                           ods_components.mimetype.encode("utf-8"), ZIP_STORED)
         self.zipf.writestr("META-INF/manifest.xml",
                            ods_components.manifest_xml.encode("utf-8"))
-        self.zipf.writestr("styles.xml",
-                           ods_components.styles_xml.encode("utf-8"))
-        self.default_sheet = None
-        self.sheets = []
+
+    @property
+    def dom(self):
+        """
+        The content.xml document as an xml.dom.minidom Document with backend="minidom", otherwise None. Changes made to
+        it are written out on close. Only the tables are kept in a DOM while a spreadsheet is written, so the rest of
+        content.xml is parsed the first time this is used.
+        """
+        if isinstance(self.document, MinidomDocument):
+            return self.document.content_dom()
+        return None
 
     def __enter__(self):
         return self
@@ -52,8 +121,34 @@ class ODSWriter(object):
         you must call this manually, it is not triggered automatically like on a file object.
         :return: Nothing.
         """
-        self.zipf.writestr("content.xml", self.dom.toxml().encode("utf-8"))
-        self.zipf.close()
+        try:
+            if self.streaming:
+                self.content.close()
+            else:
+                for sheet in self.sheets:
+                    sheet.finish()
+                    if self.column_styles is not None:
+                        sheet.set_columns(self.column_styles.runs(sheet.widths, sheet.cols))
+                start = time.perf_counter()
+                content = self.document.toxml(self.column_styles).encode("utf-8")
+                compress_start = time.perf_counter()
+                if self.compress_threads:
+                    with open_member(self.zipf, "content.xml", self.compress_threads) as member:
+                        member.write(content)
+                else:
+                    self.zipf.writestr("content.xml", content)
+                if self.stats is not None:
+                    self.stats.add_time("serialize", compress_start - start)
+                    self.stats.add_time("compress", time.perf_counter() - compress_start)
+            if self.zipf is not None:
+                # Written last, as cells can be given new styles right up until the end.
+                self.zipf.writestr("styles.xml",
+                                   self.styles.styles_xml(ods_components.styles_xml).encode("utf-8"))
+        finally:
+            if self.zipf is not None:
+                self.zipf.close()
+        if self.stats is not None:
+            self.stats.finish(self.zipf)
 
     def writerow(self, cells):
         """
@@ -74,23 +169,104 @@ class ODSWriter(object):
         for row in rows:
             self.writerow(row)
 
-    def new_sheet(self, name=None, cols=None):
+    def write_batch(self, rows, batch_size=BATCH_SIZE):
+        """
+        Write rows into the default sheet of the spreadsheet a batch at a time, see StreamingSheet.write_batch. This is
+        faster than writerows for bulk loads in streaming mode.
+        :param rows: An iterable of rows, rows are lists of cells - see writerow.
+        :param batch_size: Number of rows serialised in one go.
+        :return: Nothing.
+        """
+        if self.default_sheet is None:
+            self.default_sheet = self.new_sheet()
+        self.default_sheet.write_batch(rows, batch_size)
+
+    def write_frame(self, frame, name=None, header=True):
+        """
+        Write a pandas DataFrame, or any other mapping of column names to columns, into the spreadsheet. pandas and
+        NumPy are not required by odswriter, but columns from them are formatted a column at a time.
+        :param frame: A mapping of column names to columns, such as a DataFrame. The index of a DataFrame is not
+                      written, use reset_index if it is wanted.
+        :param name: Create a new sheet with this name for the frame. Otherwise the frame goes into the default sheet.
+        :param header: Write the column names as the first row.
+        :return: The sheet written to.
+        """
+        if name is not None:
+            sheet = self.new_sheet(name)
+        else:
+            if self.default_sheet is None:
+                self.default_sheet = self.new_sheet()
+            sheet = self.default_sheet
+        sheet.write_columns(frame, header)
+        return sheet
+
+    def new_sheet(self, name=None, cols=None, schema=None, rows=None, prefetch=True):
         """
         Create a new sheet in the spreadsheet and return it so content can be added.
         :param name: Optional name for the sheet.
         :param cols: Specify the number of columns, needed for compatibility in some cases
+        :param schema: Optional list with the type of each column, e.g. [str, decimal.Decimal, datetime.date, int]. Cells
+                       of exactly the declared type are then serialised without looking up an encoder, other cells as
+                       usual. Streaming mode only.
+        :param rows: Optional iterable of rows, such as a generator over a database cursor, which isn't read until
+                     the sheet is written out at close (or finished). Unless prefetch is False, it is read on a
+                     background thread a batch of rows ahead of the writer, so rows must not be reused by the iterable.
+        :param prefetch: Read rows on a background thread. Pass False for iterables that can only be used in the
+                         thread that created them, such as sqlite3 cursors, to read them in the calling thread.
         :return: Sheet object
         """
-        sheet = Sheet(self.dom, name, cols)
+        if name and name in self._sheets_by_name:
+            raise ValueError("There is already a sheet named {!r}.".format(name))
+        if rows is not None and prefetch:
+            rows = sources.prefetch(rows)
+        if self.streaming:
+            sheet = StreamingSheet(self.content, name, cols, schema, rows)
+        elif schema is not None:
+            raise ValueError("A schema can only be used in streaming mode.")
+        elif self.backend == "lxml":
+            sheet = LxmlSheet(self.document, name, cols, self.stats, rows)
+        else:
+            sheet = Sheet(self.document.dom, name, cols, self.stats, self.document.spreadsheet, rows)
+        if self.column_styles is not None and not self.streaming:
+            sheet.widths = ColumnWidths()
         self.sheets.append(sheet)
+        if name:
+            self._sheets_by_name[name] = sheet
         return sheet
 
+    def add_style(self, number_format=None, bold=False, italic=False, color=None, background=None):
+        """
+        Registers a cell style. Apply it by writing Cell(value, style) in place of a value. Asking for the same
+        properties again returns the same style, so this is cheap to call for every cell.
+        :param number_format: Format for numbers, such as "0.00", "#,##0" or "0.0%".
+        :param bold: Bold text.
+        :param italic: Italic text.
+        :param color: Colour of the text, e.g. "#ff0000".
+        :param background: Background colour of the cell.
+        :return: Style object
+        """
+        if self.format == "fods" and self.sheets:
+            raise ValueError("In a flat spreadsheet, styles must be added before the first sheet.")
+        return self.styles.add(number_format, bold, italic, color, background)
+
+    def get_sheet(self, name):
+        """
+        Look up a sheet made with new_sheet by its name.
+        :param name: Name of the sheet.
+        :return: Sheet object. KeyError is raised if there is no sheet with that name.
+        """
+        return self._sheets_by_name[name]
+
 
 class Sheet(object):
-    def __init__(self, dom, name="Sheet 1", cols=None):
+    def __init__(self, dom, name="Sheet 1", cols=None, stats=None, spreadsheet=None, rows=None):
         self.dom = dom
         self.cols = cols
-        spreadsheet = self.dom.getElementsByTagName("office:spreadsheet")[0]
+        self.stats = stats
+        self.rows = rows
+        self.widths = None
+        if spreadsheet is None:
+            spreadsheet = self.dom.getElementsByTagName("office:spreadsheet")[0]
         self.table = self.dom.createElement("table:table")
         if name:
             self.table.setAttribute("table:name", name)
@@ -104,53 +280,24 @@ class Sheet(object):
         spreadsheet.appendChild(self.table)
 
     def writerow(self, cells):
+        if self.stats is None:
+            self._writerow(cells)
+        else:
+            self.stats.count_row(cells)
+            with self.stats.timer("encode"):
+                self._writerow(cells)
+        if self.widths is not None:
+            self.widths.add_row(cells)
+
+    def _writerow(self, cells):
         row = self.dom.createElement("table:table-row")
         content_cells = 0
 
         for cell_data in cells:
+            attributes, text = cell_properties(cell_data)
             cell = self.dom.createElement("table:table-cell")
-            text = None
-
-            if isinstance(cell_data, (datetime.date, datetime.datetime)):
-                cell.setAttribute("office:value-type", "date")
-                date_str = cell_data.isoformat()
-                cell.setAttribute("office:date-value", date_str)
-                cell.setAttribute("table:style-name", "cDateISO")
-                text = date_str
-
-            elif isinstance(cell_data, datetime.time):
-                cell.setAttribute("office:value-type", "time")
-                cell.setAttribute("office:time-value",
-                                  cell_data.strftime("PT%HH%MM%SS"))
-                cell.setAttribute("table:style-name", "cTime")
-                text = cell_data.strftime("%H:%M:%S")
-
-            elif isinstance(cell_data, bool):
-                # Bool condition must be checked before numeric because:
-                # isinstance(True, int): True
-                # isinstance(True, bool): True
-                cell.setAttribute("office:value-type", "boolean")
-                cell.setAttribute("office:boolean-value",
-                                  "true" if cell_data else "false")
-                cell.setAttribute("table:style-name", "cBool")
-                text = "TRUE" if cell_data else "FALSE"
-
-            elif isinstance(cell_data, (float, int, decimal.Decimal, long)):
-                cell.setAttribute("office:value-type", "float")
-                float_str = unicode(cell_data)
-                cell.setAttribute("office:value", float_str)
-                text = float_str
-
-            elif isinstance(cell_data, Formula):
-                cell.setAttribute("table:formula", str(cell_data))
-
-            elif cell_data is None:
-                pass  # Empty element
-
-            else:
-                # String and unknown types become string cells
-                cell.setAttribute("office:value-type", "string")
-                text = unicode(cell_data)
+            for attribute, value in attributes.items():
+                cell.setAttribute(attribute, value)
 
             if text:
                 p = self.dom.createElement("text:p")
@@ -175,6 +322,99 @@ class Sheet(object):
         for row in rows:
             self.writerow(row)
 
+    def write_batch(self, rows, batch_size=BATCH_SIZE):
+        # Rows all end up in the DOM, so there is nothing to gain from batching them.
+        self.writerows(rows)
+
+    def write_columns(self, columns, header=False):
+        """
+        Write columnar data, such as NumPy arrays or a pandas DataFrame, into the sheet.
+        :param columns: A mapping of column names to columns, a 2-D NumPy array or a sequence of columns.
+        :param header: If columns is a mapping, write its keys as the first row.
+        :return: Nothing.
+        """
+        names, columns = columnar.split_columns(columns)
+        if header and names is not None:
+            self.writerow(names)
+        self.writerows(columnar.python_rows(columns))
+
+    def finish(self):
+        """
+        Writes the rows of the iterable given as rows, if any. This is done automatically when the spreadsheet is
+        closed.
+        :return: Nothing.
+        """
+        if self.rows is not None:
+            rows, self.rows = self.rows, None
+            self.writerows(rows)
+
+    def set_columns(self, runs):
+        """
+        Replaces the column declaration of the table with columns of the given styles, for auto_width.
+        :param runs: A list of (style name, number of columns) tuples.
+        :return: Nothing.
+        """
+        if self.cols is not None:
+            self.table.removeChild(self.table.firstChild)
+        first = self.table.firstChild
+        for name, repeats in runs:
+            col = self.dom.createElement("table:table-column")
+            col.setAttribute("table:style-name", name)
+            if repeats > 1:
+                col.setAttribute("table:number-columns-repeated", unicode(repeats))
+            self.table.insertBefore(col, first)
+
+
+class LxmlSheet(Sheet):
+    """
+    A sheet built as an lxml tree rather than a DOM, for backend="lxml".
+    """
+    def __init__(self, document, name="Sheet 1", cols=None, stats=None, rows=None):
+        self.etree = document.etree
+        self.cols = cols
+        self.stats = stats
+        self.rows = rows
+        self.widths = None
+        attributes = {qname("table:name"): name} if name else {}
+        attributes[qname("table:style-name")] = "ta1"
+        self.table = self.etree.SubElement(document.spreadsheet, qname("table:table"), attributes)
+
+        if self.cols is not None:
+            self.etree.SubElement(self.table, qname("table:table-column"),
+                                  {qname("table:number-columns-repeated"): unicode(self.cols)})
+
+    def _writerow(self, cells):
+        sub_element = self.etree.SubElement
+        row = sub_element(self.table, qname("table:table-row"))
+        cell_name = qname("table:table-cell")
+        p_name = qname("text:p")
+        content_cells = 0
+
+        for cell_data in cells:
+            attributes, text = cell_properties(cell_data)
+            cell = sub_element(row, cell_name, {qname(attribute): value for attribute, value in attributes.items()})
+            if text:
+                sub_element(cell, p_name).text = text
+            content_cells += 1
+
+        if self.cols is not None:
+            if content_cells > self.cols:
+                self.table.remove(row)
+                raise Exception("More cells than cols.")
+
+            for _ in range(content_cells, self.cols):
+                sub_element(row, cell_name)
+
+    def set_columns(self, runs):
+        if self.cols is not None:
+            self.table.remove(self.table[0])
+        for index, (name, repeats) in enumerate(runs):
+            attributes = {qname("table:style-name"): name}
+            if repeats > 1:
+                attributes[qname("table:number-columns-repeated")] = unicode(repeats)
+            # Made at the end of the table, where it has the table's namespaces, and then moved to the start.
+            self.table.insert(index, self.etree.SubElement(self.table, qname("table:table-column"), attributes))
+
 
 def writer(odsfile, *args, **kwargs):
     """
@@ -187,3 +427,50 @@ def writer(odsfile, *args, **kwargs):
         Otherwise you will get "TypeError: must be str, not bytes"
     """
     return ODSWriter(odsfile, *args, **kwargs)
+
+
+def appender(source, odsfile, *args, **kwargs):
+    """
+        Returns an ODSAppender object, which adds rows to the spreadsheet source and writes the result to odsfile.
+
+        with open("report.ods", "rb") as source, open("report-new.ods", "wb") as f:
+            with odswriter.appender(source, f) as odsfile:
+                odsfile.get_sheet("Orders").writerows(new_orders)
+    """
+    return ODSAppender(source, odsfile, *args, **kwargs)
+
+
+def stream(rows, *args, **kwargs):
+    """
+        Generates a spreadsheet as chunks of bytes while the rows are being read, for example to use as the body of a
+        WSGI response. Nothing is written to disk and the first bytes are available straight away.
+
+        :param rows: Either an iterable of rows, written to a single sheet, or a dict of sheet names to iterables of
+                     rows. Each sheet is read in turn.
+        :param args: Other arguments for ODSWriter. streaming=True is always used.
+        :return: Generator of bytes.
+    """
+    buffer = ChunkBuffer()
+    odsfile = ODSWriter(buffer, *args, streaming=True, **kwargs)
+    if hasattr(rows, "items"):
+        sheets = rows.items()
+    else:
+        sheets = [(None, rows)]
+    for name, sheet_rows in sheets:
+        sheet = odsfile.new_sheet(name)
+        for row in sheet_rows:
+            sheet.writerow(row)
+            data = buffer.take()
+            if data:
+                yield data
+        sheet.finish()
+    odsfile.close()
+    yield buffer.take()
+
+
+def __getattr__(name):
+    # asyncio takes longer to import than the rest of odswriter put together, so aio is only imported when used.
+    if name == "AsyncODSWriter":
+        from .aio import AsyncODSWriter
+        return AsyncODSWriter
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
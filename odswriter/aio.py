@@ -0,0 +1,155 @@
+from __future__ import unicode_literals
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import ZIP_STORED
+
+from .streaming import ChunkBuffer, CHUNK_SIZE
+
+# Rows are handed to the writer thread in batches of this many rows.
+BATCH_SIZE = 1000
+
+
+class _SinkBuffer(ChunkBuffer):
+    """
+    The file the writer thread writes to. Once a chunk of chunk_size bytes has built up, the writer thread hands it to
+    the sink on the event loop and waits until the sink has taken it. So the sink's back-pressure holds up the writer,
+    and no more than a chunk is held in memory however much a single call (such as close) writes.
+    """
+    def __init__(self, send, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.send = send
+        self.chunk_size = chunk_size
+        self.loop = None
+        self._size = 0
+
+    def write(self, data):
+        super().write(data)
+        self._size += len(data)
+        if self._size >= self.chunk_size:
+            asyncio.run_coroutine_threadsafe(self.send(self.take()), self.loop).result()
+        return len(data)
+
+    def take(self):
+        self._size = 0
+        return super().take()
+
+
+class AsyncSheet(object):
+    """
+    A sheet of an AsyncODSWriter. Rows are gathered into batches which are serialised and compressed off the event
+    loop.
+    """
+    def __init__(self, writer, sheet):
+        self.writer = writer
+        self.sheet = sheet
+        self._batch = []
+
+    async def writerow(self, cells):
+        # Copy the row, as it won't be serialised until later.
+        self._batch.append(list(cells))
+        if len(self._batch) >= BATCH_SIZE:
+            await self.flush()
+
+    async def writerows(self, rows):
+        """
+        :param rows: An iterable or async iterable of rows.
+        """
+        if hasattr(rows, "__aiter__"):
+            async for row in rows:
+                await self.writerow(row)
+        else:
+            for row in rows:
+                await self.writerow(row)
+
+    async def flush(self):
+        """
+        Serialise the rows written so far and pass the output on to the sink.
+        """
+        if self._batch:
+            batch, self._batch = self._batch, []
+            await self.writer._run(self.sheet.write_batch, batch)
+
+
+class AsyncODSWriter(object):
+    """
+    Writes an OpenDocument Spreadsheet to an asynchronous byte sink, for example an aiohttp StreamResponse. Use it like
+    an ODSWriter, but await writerow, writerows, new_sheet and close, or use it as an async context manager.
+
+    The spreadsheet is written with a streaming ODSWriter on a single background thread, so the event loop is never
+    blocked by serialisation or compression. The zip file is written without seeking, so the sink receives compressed
+    chunks as soon as they are produced, and the writer waits for the sink to take each chunk before carrying on.
+    """
+    def __init__(self, sink, compression=ZIP_STORED, **kwargs):
+        """
+        :param sink: An object with an async write(data) method, or an async function which takes bytes.
+        :param compression: As for ODSWriter.
+        :param kwargs: Other arguments for ODSWriter. streaming=True is always used.
+        """
+        from . import ODSWriter
+        self._write = getattr(sink, "write", sink)
+        self._buffer = _SinkBuffer(self._send)
+        self._executor = ThreadPoolExecutor(1)
+        self.writer = ODSWriter(self._buffer, compression, streaming=True, **kwargs)
+        self.default_sheet = None
+        self.sheets = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.close()
+
+    async def _send(self, data):
+        await self._write(data)
+
+    async def _run(self, func, *args):
+        self._buffer.loop = asyncio.get_running_loop()
+        result = await self._buffer.loop.run_in_executor(self._executor, func, *args)
+        data = self._buffer.take()
+        if data:
+            await self._write(data)
+        return result
+
+    async def new_sheet(self, name=None, cols=None, schema=None):
+        """
+        Create a new sheet in the spreadsheet and return it so content can be added. See ODSWriter.new_sheet.
+        :return: AsyncSheet object
+        """
+        sheet = AsyncSheet(self, await self._run(self.writer.new_sheet, name, cols, schema))
+        self.sheets.append(sheet)
+        return sheet
+
+    def add_style(self, *args, **kwargs):
+        """
+        Registers a cell style, see ODSWriter.add_style.
+        :return: Style object
+        """
+        return self.writer.add_style(*args, **kwargs)
+
+    async def writerow(self, cells):
+        """
+        Write a row of cells into the default sheet of the spreadsheet.
+        """
+        if self.default_sheet is None:
+            self.default_sheet = await self.new_sheet()
+        await self.default_sheet.writerow(cells)
+
+    async def writerows(self, rows):
+        """
+        Write rows into the default sheet of the spreadsheet.
+        :param rows: An iterable or async iterable of rows.
+        """
+        if self.default_sheet is None:
+            self.default_sheet = await self.new_sheet()
+        await self.default_sheet.writerows(rows)
+
+    async def close(self):
+        """
+        Writes out the remaining rows and finalises the spreadsheet. The sink itself is not closed.
+        """
+        try:
+            for sheet in self.sheets:
+                await sheet.flush()
+            await self._run(self.writer.close)
+        finally:
+            self._executor.shutdown()
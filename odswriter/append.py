@@ -0,0 +1,271 @@
+from __future__ import unicode_literals
+import copy
+import re
+import struct
+from zipfile import ZipFile
+
+from .compression import open_member
+from .serializer import encode_row
+from .streaming import SpillBuffer, SPILL_THRESHOLD, CHUNK_SIZE
+
+# The tags of content.xml which rows are added around. Sheet-local named ranges come after the rows of a table, so
+# rows are added before them.
+_TAGS = re.compile(br"<table:table(?=[\s/>])([^>]*)>|</table:table>|<table:named-expressions(?=[\s/>])")
+_NAME = re.compile(br'table:name="([^"]*)"')
+
+_LOCAL_HEADER_SIZE = 30
+_DATA_DESCRIPTOR = 0x08
+_ZIP64_EXTRA = 0x0001
+
+
+def _unescape(text):
+    # As xml.sax.saxutils.unescape, which isn't used as importing it brings in urllib.
+    return (text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", "\"").replace("&apos;", "'")
+            .replace("&amp;", "&"))
+
+
+def _strip_zip64(extra):
+    # FileHeader adds its own zip64 record when one is needed.
+    records = []
+    while len(extra) >= 4:
+        tag, size = struct.unpack("<HH", extra[:4])
+        if tag != _ZIP64_EXTRA:
+            records.append(extra[:4 + size])
+        extra = extra[4 + size:]
+    return b"".join(records)
+
+
+def copy_member(source, zipf, info, chunk_size=CHUNK_SIZE):
+    """
+    Copies a member of the zip file source into zipf as it is, without decompressing and recompressing it.
+    :param source: ZipFile open for reading.
+    :param zipf: ZipFile open for writing.
+    :param info: ZipInfo of the member in source.
+    """
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(_LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    # ZipFile has no public way to write data which is already compressed, so the local header is written here and
+    # the member registered with zipf the same way ZipFile.writestr does. The sizes are known, so no data descriptor.
+    info = copy.copy(info)
+    info.flag_bits &= ~_DATA_DESCRIPTOR
+    info.extra = _strip_zip64(info.extra)
+    info.header_offset = zipf.fp.tell()
+    zipf.fp.write(info.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        data = source.fp.read(min(chunk_size, remaining))
+        if not data:
+            raise EOFError("{} is truncated.".format(info.filename))
+        zipf.fp.write(data)
+        remaining -= len(data)
+    zipf.start_dir = zipf.fp.tell()
+    zipf.filelist.append(info)
+    zipf.NameToInfo[info.filename] = info
+    zipf._didModify = True
+
+
+class _MemberOutput(object):
+    def __init__(self, member):
+        self.write_bytes = member.write
+
+
+class AppendSheet(object):
+    """
+    Rows to be added to the end of an existing sheet. They are serialised straight away and held until the
+    ODSAppender is closed.
+    """
+    def __init__(self, spill_threshold=SPILL_THRESHOLD):
+        self.buffer = SpillBuffer(spill_threshold)
+
+    def writerow(self, cells):
+        self.buffer.write(encode_row(cells))
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def close(self):
+        self.buffer.close()
+
+
+class ODSAppender(object):
+    """
+    Adds rows to the sheets of an existing OpenDocument Spreadsheet, writing the result as a new file. Use it like an
+    ODSWriter: writerow adds rows to the first sheet and get_sheet(name) returns a sheet to add rows to.
+
+    The spreadsheet isn't parsed. On close, every file in the archive apart from content.xml is copied across without
+    being recompressed and content.xml is rewritten in a single pass, with the new rows added after the last row of
+    each sheet. Any trailing rows in the sheet, such as blank formatted rows saved by LibreOffice, stay before the new
+    rows.
+    """
+    def __init__(self, source, odsfile, compression=None, spill_threshold=SPILL_THRESHOLD, compress_threads=None,
+                 chunk_size=CHUNK_SIZE):
+        """
+        :param source: Path or binary file of the existing spreadsheet. It must be seekable.
+        :param odsfile: Path or binary file to write the new spreadsheet to. This can't be the same file as source.
+        :param compression: Compression for the rewritten content.xml. By default that of the existing content.xml.
+                            Other files keep their own compression.
+        :param spill_threshold: See ODSWriter.
+        :param compress_threads: See ODSWriter.
+        """
+        self.source = ZipFile(source)
+        try:
+            if compression is None:
+                compression = self.source.getinfo("content.xml").compress_type
+            self.zipf = ZipFile(odsfile, "w", compression)
+        except Exception:
+            self.source.close()
+            raise
+        self.spill_threshold = spill_threshold
+        self.compress_threads = compress_threads
+        self.chunk_size = chunk_size
+        self.default_sheet = None
+        self._sheets_by_name = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def writerow(self, cells):
+        """
+        Add a row of cells to the end of the first sheet of the spreadsheet.
+        :param cells: A list of cells, as for ODSWriter.writerow.
+        :return: Nothing.
+        """
+        if self.default_sheet is None:
+            self.default_sheet = AppendSheet(self.spill_threshold)
+        self.default_sheet.writerow(cells)
+
+    def writerows(self, rows):
+        """
+        Add rows to the end of the first sheet of the spreadsheet.
+        :param rows: A list of rows, rows are lists of cells - see writerow.
+        :return: Nothing.
+        """
+        for row in rows:
+            self.writerow(row)
+
+    def get_sheet(self, name):
+        """
+        Returns the sheet with this name, to add rows to. As the spreadsheet isn't read until close, a KeyError is
+        raised then if there is no sheet with this name, see close.
+        :param name: Name of the sheet.
+        :return: AppendSheet object
+        """
+        if name not in self._sheets_by_name:
+            self._sheets_by_name[name] = AppendSheet(self.spill_threshold)
+        return self._sheets_by_name[name]
+
+    def close(self):
+        """
+        Writes the new spreadsheet. You must call this if you aren't using the context manager.
+
+        If this raises, such as a KeyError for a sheet which isn't in the spreadsheet, the zip file's central directory
+        isn't written. Whatever was written to odsfile is then not a readable zip file, rather than a spreadsheet
+        without some of the new rows.
+        :return: Nothing.
+        """
+        try:
+            for info in self.source.infolist():
+                if info.filename == "content.xml":
+                    self._rewrite_content()
+                else:
+                    copy_member(self.source, self.zipf, info, self.chunk_size)
+        except BaseException:
+            # ZipFile.close only writes the central directory if the file has been modified.
+            self.zipf._didModify = False
+            raise
+        finally:
+            self.zipf.close()
+            self.source.close()
+            for sheet in self._sheets():
+                sheet.close()
+
+    def _sheets(self):
+        if self.default_sheet is not None:
+            yield self.default_sheet
+        for sheet in self._sheets_by_name.values():
+            yield sheet
+
+    def _sheets_for(self, index, attributes):
+        sheets = []
+        if index == 0 and self.default_sheet is not None:
+            sheets.append(self.default_sheet)
+        match = _NAME.search(attributes)
+        if match is not None:
+            name = _unescape(match.group(1).decode("utf-8"))
+            sheet = self._sheets_by_name.get(name)
+            if sheet is not None:
+                sheets.append(sheet)
+                self._found.add(name)
+        return sheets
+
+    def _rewrite_content(self):
+        self._found = set()
+        tables = 0
+        depth = 0
+        pending = []
+        carry = b""
+        with self.source.open("content.xml") as reader, \
+                open_member(self.zipf, "content.xml", self.compress_threads) as member:
+            output = _MemberOutput(member)
+
+            def add_rows(sheets):
+                for sheet in sheets:
+                    sheet.buffer.copy_to(output)
+
+            while True:
+                data = reader.read(self.chunk_size)
+                buffer = carry + data
+                # A tag can't contain "<", so everything before the last "<" holds only complete tags.
+                cut = buffer.rfind(b"<") if data else -1
+                if cut == -1:
+                    cut = len(buffer)
+                written = 0
+                for match in _TAGS.finditer(buffer, 0, cut):
+                    tag = match.group(0)
+                    if tag.startswith(b"</"):
+                        depth -= 1
+                        if depth == 0 and pending:
+                            member.write(buffer[written:match.start()])
+                            written = match.start()
+                            add_rows(pending)
+                            pending = []
+                    elif tag.startswith(b"<table:named-expressions"):
+                        if depth == 1 and pending:
+                            member.write(buffer[written:match.start()])
+                            written = match.start()
+                            add_rows(pending)
+                            pending = []
+                    else:
+                        attributes = match.group(1)
+                        empty = attributes.endswith(b"/")
+                        if depth == 0:
+                            sheets = self._sheets_for(tables, attributes)
+                            tables += 1
+                            if empty and sheets:
+                                # An empty sheet, written as <table:table .../>.
+                                member.write(buffer[written:match.start()])
+                                member.write(b"<table:table" + attributes[:-1] + b">")
+                                add_rows(sheets)
+                                member.write(b"</table:table>")
+                                written = match.end()
+                            elif not empty:
+                                pending = sheets
+                        if not empty:
+                            depth += 1
+                member.write(buffer[written:cut])
+                carry = buffer[cut:]
+                if not data:
+                    break
+
+        if self.default_sheet is not None and tables == 0:
+            raise KeyError("The spreadsheet has no sheets.")
+        missing = set(self._sheets_by_name) - self._found
+        if missing:
+            raise KeyError("There is no sheet named {!r}.".format(sorted(missing)[0]))
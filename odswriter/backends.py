@@ -0,0 +1,193 @@
+"""
+Backends for writing a spreadsheet in memory (streaming=False), where content.xml is built up as a tree of elements
+and serialised when the spreadsheet is closed.
+
+ - "minidom" builds an xml.dom.minidom document, which is available as ODSWriter.dom. It needs nothing outside the
+   standard library and is the default.
+ - "lxml" builds an lxml.etree tree, which is around three times faster and takes half the memory. It needs lxml.
+   The output is the same as minidom's from Python 3.13, except for carriage returns in text, which lxml writes as
+   &#13; and minidom leaves as they are (so readers turn them into line feeds). Before Python 3.13, minidom also
+   escapes quotes in text and doesn't escape tabs and line breaks in attributes, while lxml does the opposite.
+
+Streaming mode doesn't build a tree at all: rows are serialised straight to text, which is faster than either backend.
+
+The default backend is chosen when odswriter is imported, from the ODSWRITER_BACKEND environment variable. If that
+names a backend which isn't available, minidom is used.
+"""
+from __future__ import unicode_literals
+import datetime
+import decimal
+import importlib.util
+import os
+
+from .formatting import format_number, format_duration, format_time
+from .formula import Formula
+from .styles import Cell
+
+BACKENDS = ("minidom", "lxml")
+
+NAMESPACES = {
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+}
+
+# Prefixed names, as minidom uses them, to the {namespace}name form lxml uses.
+_qnames = {}
+
+
+def qname(name):
+    """
+    :param name: A prefixed name, e.g. "table:table-cell".
+    :return: The name in lxml's {namespace}name form.
+    """
+    try:
+        return _qnames[name]
+    except KeyError:
+        prefix, local = name.split(":")
+        result = _qnames[name] = "{%s}%s" % (NAMESPACES[prefix], local)
+        return result
+
+
+def available(name):
+    """
+    :param name: Name of a backend.
+    :return: Whether the backend can be used, i.e. it exists and what it needs is installed.
+    """
+    if name == "lxml":
+        return importlib.util.find_spec("lxml") is not None
+    return name in BACKENDS
+
+
+def _default_backend():
+    name = os.environ.get("ODSWRITER_BACKEND", "minidom")
+    return name if available(name) else "minidom"
+
+
+DEFAULT_BACKEND = _default_backend()
+
+
+def cell_properties(cell_data):
+    """
+    Works out the attributes and text of the table:table-cell element for a value, for the backends to build.
+    :param cell_data: Value of the cell (most basic Python types supported), optionally wrapped in a Cell.
+    :return: (attributes, text) tuple. attributes is a dict of prefixed attribute names to values, in the order they
+             are written. text is the text of the cell's paragraph, or None.
+    """
+    style = None
+    if isinstance(cell_data, Cell):
+        style = cell_data.style
+        cell_data = cell_data.value
+
+    if isinstance(cell_data, (datetime.date, datetime.datetime)):
+        date_str = cell_data.isoformat()
+        attributes = {"office:value-type": "date", "office:date-value": date_str, "table:style-name": "cDateISO"}
+        text = date_str
+
+    elif isinstance(cell_data, datetime.time):
+        attributes = {"office:value-type": "time", "office:time-value": format_duration(cell_data),
+                      "table:style-name": "cTime"}
+        text = format_time(cell_data)
+
+    elif isinstance(cell_data, bool):
+        # Bool condition must be checked before numeric because:
+        # isinstance(True, int): True
+        # isinstance(True, bool): True
+        attributes = {"office:value-type": "boolean", "office:boolean-value": "true" if cell_data else "false",
+                      "table:style-name": "cBool"}
+        text = "TRUE" if cell_data else "FALSE"
+
+    elif isinstance(cell_data, (float, int, decimal.Decimal)):
+        float_str = format_number(cell_data)
+        if float_str is None:  # NaN leaves the cell empty.
+            attributes = {}
+        else:
+            attributes = {"office:value-type": "float", "office:value": float_str}
+        text = float_str
+
+    elif isinstance(cell_data, Formula):
+        attributes = {"table:formula": str(cell_data)}
+        text = None
+
+    elif cell_data is None:
+        attributes = {}  # Empty element
+        text = None
+
+    else:
+        # String and unknown types become string cells
+        attributes = {"office:value-type": "string"}
+        text = str(cell_data)
+
+    if style is not None:
+        fixed = attributes.get("table:style-name", "")
+        attributes["table:style-name"] = style.names.get(fixed, style.name)
+    return attributes, text
+
+
+class MinidomDocument(object):
+    """
+    The office:spreadsheet element of content.xml as a minidom document, for backend="minidom". Only the tables are
+    held in the DOM, the rest of content.xml is the same as for the streaming writer, so making a writer doesn't need
+    a parse of the whole skeleton. content_dom parses it when the whole document is asked for.
+    """
+    def __init__(self):
+        from xml.dom.minidom import Document
+        self.dom = Document()
+        self.spreadsheet = self.dom.appendChild(self.dom.createElement("office:spreadsheet"))
+        self.content = None
+
+    def content_dom(self):
+        """
+        Parses the whole content.xml skeleton and moves the tables into it, for ODSWriter.dom. From then on, tables are
+        added to that document and toxml serialises all of it, so changes made to the rest of it are kept.
+        :return: The content.xml document.
+        """
+        if self.content is None:
+            from xml.dom.minidom import parseString
+            from . import ods_components
+            self.content = parseString(ods_components.content_xml)
+            spreadsheet = self.content.getElementsByTagName("office:spreadsheet")[0]
+            for table in list(self.spreadsheet.childNodes):
+                spreadsheet.appendChild(table)
+            self.spreadsheet = spreadsheet
+        return self.content
+
+    def toxml(self, column_styles=None):
+        """
+        :param column_styles: ColumnStyles to add to the automatic styles, if any.
+        :return: The text of content.xml.
+        """
+        if self.content is not None:
+            xml = self.content.toxml()
+            return xml if column_styles is None else column_styles.add_to(xml)
+        from .streaming import content_chunks
+        prefix, suffix = content_chunks()
+        if column_styles is not None:
+            prefix = column_styles.add_to(prefix)
+        return prefix + "".join(table.toxml() for table in self.spreadsheet.childNodes) + suffix
+
+
+class LxmlDocument(object):
+    """
+    The office:spreadsheet element of content.xml as an lxml tree, for backend="lxml". Only the tables are held in the
+    tree, the rest of content.xml is the same as for the streaming writer.
+    """
+    def __init__(self):
+        from lxml import etree
+        self.etree = etree
+        self.spreadsheet = etree.Element(qname("office:spreadsheet"), nsmap=NAMESPACES)
+
+    def toxml(self, column_styles=None):
+        """
+        :param column_styles: ColumnStyles to add to the automatic styles, if any.
+        :return: The text of content.xml.
+        """
+        from .streaming import content_chunks
+        prefix, suffix = content_chunks()
+        if column_styles is not None:
+            prefix = column_styles.add_to(prefix)
+        if not len(self.spreadsheet):
+            return prefix + suffix
+        # The spreadsheet element declares the namespaces, which content.xml already does further up.
+        tables = self.etree.tostring(self.spreadsheet, encoding="unicode")
+        return prefix + tables[tables.index(">") + 1:tables.rindex("</")] + suffix
@@ -0,0 +1,129 @@
+from __future__ import unicode_literals
+
+from .formatting import INFINITIES
+from .serializer import EMPTY_CELL, encode_cell, float_cell, date_cell, bool_cell
+
+# Columns are formatted this many rows at a time, so that only one slice of each column is held as text.
+ROWS_PER_CHUNK = 10000
+
+
+def split_columns(columns):
+    """
+    Accepts the various forms of columnar data that Sheet.write_columns does.
+    :param columns: A mapping of column names to columns (e.g. a dict or pandas DataFrame), a 2-D NumPy array or a
+                    sequence of columns. Columns may be NumPy arrays, pandas Series or any other sequence.
+    :return: (names, columns) tuple, names is None unless columns was a mapping.
+    """
+    if hasattr(columns, "keys"):
+        names = list(columns.keys())
+        columns = [columns[name] for name in names]
+    else:
+        names = None
+        if getattr(columns, "ndim", None) == 2:
+            columns = [columns[:, i] for i in range(columns.shape[1])]
+        columns = list(columns)
+
+    columns = [_column_values(column) for column in columns]
+    if len(set(len(column) for column in columns)) > 1:
+        raise ValueError("Columns must all have the same length.")
+    return names, columns
+
+
+def _column_values(column):
+    if hasattr(column, "to_numpy"):
+        # A pandas Series. Missing values in columns that NumPy can't represent them in become None. Both the column
+        # and the array which comes out have to be checked: a nullable integer column becomes floats, while a tz-aware
+        # datetime column has kind "M" but becomes an object array of Timestamps and NaT.
+        values = column.to_numpy()
+        if column.hasnans and (column.dtype.kind not in "fM" or values.dtype.kind not in "fM"):
+            values = column.astype(object).where(column.notna(), None).to_numpy()
+        return values
+    return column
+
+
+def _kind(column):
+    dtype = getattr(column, "dtype", None)
+    return getattr(dtype, "kind", None)
+
+
+def _datetime_strings(column):
+    import numpy
+    unit = numpy.datetime_data(column.dtype)[0]
+    if unit in ("Y", "M", "W", "D"):
+        return numpy.datetime_as_string(column, unit="D").tolist()
+    seconds = column.astype("datetime64[s]")
+    whole_seconds = bool(((seconds == column) | numpy.isnat(column)).all())
+    return numpy.datetime_as_string(column, unit="s" if whole_seconds else "us").tolist()
+
+
+def encode_column(column):
+    """
+    Serialises a column of cells. NumPy integer, float, boolean and datetime64 columns are formatted a whole column at
+    a time without checking the type of each cell, other columns cell by cell. NaN and NaT become empty cells.
+    :param column: A NumPy array or other sequence of cells.
+    :return: A list of serialised cells.
+    """
+    kind = _kind(column)
+    # Numbers are formatted through tolist and str rather than astype(str), which gives the same text as writerow
+    # and is faster for floats.
+    if kind in ("i", "u"):
+        return [float_cell(text) for text in map(str, column.tolist())]
+    elif kind == "f":
+        import numpy
+        missing = numpy.isnan(column).tolist()
+        texts = map(str, column.tolist())
+        if numpy.isinf(column).any():
+            texts = [INFINITIES.get(text, text) for text in texts]
+        return [EMPTY_CELL if nan else float_cell(text) for text, nan in zip(texts, missing)]
+    elif kind == "b":
+        return [bool_cell(cell_data) for cell_data in column.tolist()]
+    elif kind == "M":
+        return [EMPTY_CELL if text == "NaT" else date_cell(text) for text in _datetime_strings(column)]
+    elif kind is not None:
+        column = column.tolist()
+    return [encode_cell(cell_data) for cell_data in column]
+
+
+def python_values(column):
+    """
+    Converts a column into Python values which writerow accepts, for writers that don't serialise text directly.
+    :param column: A NumPy array or other sequence of cells.
+    :return: A list of cells.
+    """
+    kind = _kind(column)
+    if kind == "f":
+        import numpy
+        return [None if nan else cell_data for cell_data, nan in zip(column.tolist(), numpy.isnan(column).tolist())]
+    elif kind == "M":
+        import numpy
+        unit = numpy.datetime_data(column.dtype)[0]
+        return column.astype("datetime64[D]" if unit in ("Y", "M", "W", "D") else "datetime64[us]").tolist()
+    elif kind is not None:
+        return column.tolist()
+    return list(column)
+
+
+def encoded_rows(columns):
+    """
+    Serialises columns and then yields their cells row by row.
+    :param columns: A list of columns, see split_columns.
+    :return: Generator of lists of serialised cells.
+    """
+    length = len(columns[0]) if columns else 0
+    for start in range(0, length, ROWS_PER_CHUNK):
+        chunk = [encode_column(column[start:start + ROWS_PER_CHUNK]) for column in columns]
+        for parts in zip(*chunk):
+            yield list(parts)
+
+
+def python_rows(columns):
+    """
+    Yields the cells of columns row by row, as Python values.
+    :param columns: A list of columns, see split_columns.
+    :return: Generator of rows.
+    """
+    length = len(columns[0]) if columns else 0
+    for start in range(0, length, ROWS_PER_CHUNK):
+        chunk = [python_values(column[start:start + ROWS_PER_CHUNK]) for column in columns]
+        for cells in zip(*chunk):
+            yield list(cells)
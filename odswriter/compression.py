@@ -0,0 +1,83 @@
+from __future__ import unicode_literals
+import collections
+import zlib
+from zipfile import ZIP_DEFLATED
+
+# Data is compressed in blocks of this many bytes, one block per task.
+BLOCK_SIZE = 128 * 1024
+
+# Deflate can refer back up to 32KiB, so each block is primed with the end of the block before it.
+_WINDOW_SIZE = 32 * 1024
+
+
+def _deflate_block(data, dictionary, level, last):
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    # Z_SYNC_FLUSH ends the block on a byte boundary without ending the stream, so the compressed blocks can simply
+    # be concatenated.
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelCompressor(object):
+    """
+    A drop-in replacement for the zlib compressor of a zip member which deflates blocks of data on a pool of threads,
+    in the style of pigz. zlib releases the GIL while compressing, so this scales with the number of threads. The
+    output is a single ordinary raw deflate stream.
+    """
+    def __init__(self, threads, level=None, block_size=BLOCK_SIZE):
+        self.level = zlib.Z_DEFAULT_COMPRESSION if level is None else level
+        self.block_size = block_size
+        self.max_pending = threads * 2
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(threads)
+        self._pending = collections.deque()
+        self._buffer = []
+        self._buffered = 0
+        self._dictionary = b""
+
+    def _submit(self, data, last):
+        self._pending.append(self._executor.submit(_deflate_block, data, self._dictionary, self.level, last))
+        self._dictionary = data[-_WINDOW_SIZE:]
+
+    def compress(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered < self.block_size:
+            return b""
+
+        data = b"".join(self._buffer)
+        full = len(data) - len(data) % self.block_size
+        for start in range(0, full, self.block_size):
+            self._submit(data[start:start + self.block_size], False)
+        self._buffer = [data[full:]]
+        self._buffered = len(data) - full
+
+        output = []
+        while self._pending and (self._pending[0].done() or len(self._pending) > self.max_pending):
+            output.append(self._pending.popleft().result())
+        return b"".join(output)
+
+    def flush(self):
+        self._submit(b"".join(self._buffer), True)
+        self._buffer = []
+        output = [future.result() for future in self._pending]
+        self._pending.clear()
+        self._executor.shutdown()
+        return b"".join(output)
+
+
+def open_member(zipf, name, compress_threads=None):
+    """
+    Opens a member of zipf for writing, compressing it with a ParallelCompressor if it is deflated and
+    compress_threads is given. The member is always written with ZIP64 headers, as its size isn't known up front and
+    ZipFile can't switch to ZIP64 after the header is written, so members over 2GiB would fail at close otherwise.
+    :return: A writable file-like object, as returned by ZipFile.open.
+    """
+    member = zipf.open(name, "w", force_zip64=True)
+    if compress_threads and zipf.compression == ZIP_DEFLATED:
+        # ZipFile has no public hook for this. The zip member computes the CRC and sizes itself and only hands the
+        # data to _compressor, so replacing it is enough.
+        member._compressor = ParallelCompressor(compress_threads, zipf.compresslevel)
+    return member
@@ -0,0 +1,60 @@
+from __future__ import unicode_literals
+import decimal
+
+# Infinities in the lexical form of xsd:double, which office:value uses. NaN has no place in a spreadsheet, so NaN
+# cells are left empty.
+INFINITIES = {"inf": "INF", "-inf": "-INF"}
+
+
+def format_float(value):
+    """
+    :param value: A float, or an instance of a subclass of float such as numpy.float64.
+    :return: The shortest text which reads back as the same float, or None for NaN.
+    """
+    # float.__repr__ rather than repr, so that subclasses are formatted as plain floats.
+    text = float.__repr__(value)
+    if text[-1] in "fn":
+        return INFINITIES.get(text)
+    return text
+
+
+def format_decimal(value):
+    """
+    :return: The text of a Decimal, or None for NaN.
+    """
+    if value.is_finite():
+        return str(value)
+    if value.is_nan():
+        return None
+    return "-INF" if value.is_signed() else "INF"
+
+
+def format_number(value):
+    """
+    :param value: An int, float or Decimal.
+    :return: Text for the office:value of a float cell, or None for NaN.
+    """
+    if isinstance(value, float):
+        return format_float(value)
+    if isinstance(value, decimal.Decimal):
+        return format_decimal(value)
+    return str(value)
+
+
+def format_duration(value):
+    """
+    :param value: A datetime.time.
+    :return: The time as an ISO 8601 duration for office:time-value, keeping any fraction of a second.
+    """
+    if value.microsecond:
+        return "PT%02dH%02dM%02d%sS" % (value.hour, value.minute, value.second,
+                                        (".%06d" % value.microsecond).rstrip("0"))
+    return "PT%02dH%02dM%02dS" % (value.hour, value.minute, value.second)
+
+
+def format_time(value):
+    """
+    :param value: A datetime.time.
+    :return: The time as it is displayed in the cell, hh:mm:ss.
+    """
+    return "%02d:%02d:%02d" % (value.hour, value.minute, value.second)
@@ -20,8 +20,47 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import functools
 import re
 
+# Compiled formulae are cached, as the same formula is often written on many rows.
+CACHE_SIZE = 4096
+
+_cell_refs = re.compile(r"([A-Z]+[0-9]+(:[A-Z]+[0-9]+)?)")
+_bare_cell_refs = re.compile(r"([A-Z]+[0-9]+)(?!\()")
+_compiled_cell_refs = re.compile(r"\.([A-Z]+)([0-9]+)")
+
+
+def _compile(s):
+    # Remove = sign if present
+    if s.startswith("="):
+        s = s[1:]
+    # Wrap cell refs in square brackets.
+    s = _cell_refs.sub(r"[\1]", s)
+    # Place a . before cell references, so for example . A2 becomes .A2
+    s = _bare_cell_refs.sub(r".\1", s)
+    return "of:={}".format(s)
+
+
+compile_formula = functools.lru_cache(maxsize=CACHE_SIZE)(_compile)
+
+
+def formula_cache_info():
+    """
+    :return: Hits, misses and size of the compiled formula cache, as a functools.lru_cache CacheInfo.
+    """
+    return compile_formula.cache_info()
+
+
+def set_formula_cache_size(maxsize):
+    """
+    Changes how many compiled formulae are cached. This also clears the cache.
+    :param maxsize: Maximum number of formulae, or None for no limit.
+    """
+    global compile_formula
+    compile_formula = functools.lru_cache(maxsize=maxsize)(_compile)
+
+
 class Formula(object):
     """
         IMPORTANT NOTE: The formula object currently does no validation on the formula that you supply and it assumes
@@ -37,12 +76,83 @@ class Formula(object):
         self.formula_string = s
 
     def __str__(self):
-        s = self.formula_string
-        # Remove = sign if present
-        if s.startswith("="):
-            s = s[1:]
-        # Wrap cell refs in square brackets.
-        s = re.sub(r"([A-Z]+[0-9]+(:[A-Z]+[0-9]+)?)", r"[\1]", s)
-        # Place a . before cell references, so for example . A2 becomes .A2
-        s = re.sub(r"([A-Z]+[0-9]+)(?!\()", r".\1", s)
-        return "of:={}".format(s)
\ No newline at end of file
+        return compile_formula(self.formula_string)
+
+
+class CompiledFormula(Formula):
+    """
+        A formula which has already been converted to OpenDocument syntax, see FormulaTemplate.
+    """
+    def __init__(self, s, compiled):
+        super(CompiledFormula, self).__init__(s)
+        self.compiled = compiled
+
+    def __str__(self):
+        return self.compiled
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def _column_letters(number):
+    letters = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class FormulaTemplate(object):
+    """
+        A formula written for one cell which can be repeated on other rows or columns with its cell references moved
+        along, like copying and pasting a formula in a spreadsheet. The formula is only parsed once, so this is much
+        faster than making a Formula for each row.
+
+        Example: writing [price, quantity, template.shifted(rows=i)] as the (i+2)th row, with
+        template = FormulaTemplate("=A2*B2"), gives =A3*B3 on the third row, =A4*B4 on the fourth and so on.
+
+        The same caveats apply as for Formula.
+    """
+    def __init__(self, s):
+        self.formula_string = s
+        compiled = compile_formula(s)
+        # Alternating literal text and (column number, row number) references.
+        self.parts = []
+        position = 0
+        for match in _compiled_cell_refs.finditer(compiled):
+            self.parts.append(compiled[position:match.start() + 1])
+            self.parts.append((_column_number(match.group(1)), int(match.group(2))))
+            position = match.end()
+        self.parts.append(compiled[position:])
+        self._letters = {}
+
+    def _letters_for(self, column):
+        try:
+            return self._letters[column]
+        except KeyError:
+            if column < 1:
+                raise ValueError("Formula has been shifted off the left of the sheet.")
+            letters = self._letters[column] = _column_letters(column)
+            return letters
+
+    def shifted(self, rows=0, cols=0):
+        """
+        :param rows: Number of rows to move references down by.
+        :param cols: Number of columns to move references right by.
+        :return: The formula with its references moved.
+        """
+        out = []
+        for part in self.parts:
+            if part.__class__ is tuple:
+                row = part[1] + rows
+                if row < 1:
+                    raise ValueError("Formula has been shifted off the top of the sheet.")
+                out.append(self._letters_for(part[0] + cols))
+                out.append(str(row))
+            else:
+                out.append(part)
+        return CompiledFormula(self.formula_string, "".join(out))
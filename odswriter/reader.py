@@ -0,0 +1,311 @@
+"""
+Reads the rows back out of an OpenDocument spreadsheet, for checking what odswriter (or anything else) wrote without
+needing an office suite. content.xml is parsed incrementally with expat, so memory use stays flat however big the
+spreadsheet is.
+
+    with open("big.ods", "rb") as f:
+        for name, rows in reader.iter_sheets(f):
+            for row in rows:
+                ...
+
+Cells are read as Python values: float cells as int or float (Decimals aren't preserved), date cells as date or
+datetime, time cells as time (or timedelta for durations of a day or more), boolean cells as bool, string cells as
+str and empty cells as None. Other value types (percentage, currency) are read as numbers. Repeated cells and rows
+are expanded, apart from trailing empty cells in a row and trailing empty rows in a sheet, which are dropped as
+spreadsheet applications pad sheets with them.
+"""
+from __future__ import unicode_literals
+import datetime
+import re
+import zipfile
+from xml.parsers import expat
+
+from . import ods_components
+
+CHUNK_SIZE = 64 * 1024
+
+OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+# Names as expat reports them with namespace processing: the namespace URI and local name separated by a space.
+_TABLE = TABLE + " table"
+_ROW = TABLE + " table-row"
+_CELL = TABLE + " table-cell"
+_COVERED_CELL = TABLE + " covered-table-cell"
+_NAME = TABLE + " name"
+_ROWS_REPEATED = TABLE + " number-rows-repeated"
+_COLUMNS_REPEATED = TABLE + " number-columns-repeated"
+_FORMULA = TABLE + " formula"
+_VALUE_TYPE = OFFICE + " value-type"
+_STRING_VALUE = OFFICE + " string-value"
+_ANNOTATION = OFFICE + " annotation"
+_PARAGRAPHS = (TEXT + " p", TEXT + " h")
+_SPACE = TEXT + " s"
+_SPACE_COUNT = TEXT + " c"
+_TAB = TEXT + " tab"
+_LINE_BREAK = TEXT + " line-break"
+
+_SHEET = 0
+_ROWS = 1
+
+_INTEGER = re.compile(r"^-?\d+$")
+_DURATION = re.compile(r"^(-)?P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)(?:\.(\d+))?S)?$")
+
+
+def _number(text):
+    if _INTEGER.match(text):
+        return int(text)
+    return float(text)  # Also reads INF, -INF and NaN.
+
+
+def _date(text):
+    if "T" in text:
+        return datetime.datetime.fromisoformat(text)
+    return datetime.date.fromisoformat(text)
+
+
+def _time(text):
+    match = _DURATION.match(text)
+    if match is None:
+        raise ValueError("Invalid time value {!r}.".format(text))
+    negative, days, hours, minutes, seconds, fraction = match.groups()
+    microseconds = int((fraction or "")[:6].ljust(6, "0"))
+    if negative or days or int(hours or 0) >= 24:
+        duration = datetime.timedelta(days=int(days or 0), hours=int(hours or 0), minutes=int(minutes or 0),
+                                      seconds=int(seconds or 0), microseconds=microseconds)
+        return -duration if negative else duration
+    return datetime.time(int(hours or 0), int(minutes or 0), int(seconds or 0), microseconds)
+
+
+# The attribute holding the value of each value type, and how to parse it.
+_VALUES = {
+    "float": (OFFICE + " value", _number),
+    "percentage": (OFFICE + " value", _number),
+    "currency": (OFFICE + " value", _number),
+    "date": (OFFICE + " date-value", _date),
+    "time": (OFFICE + " time-value", _time),
+    "boolean": (OFFICE + " boolean-value", lambda text: text == "true"),
+}
+
+
+class _Handler(object):
+    """
+    Turns the parser events of content.xml into a list of events: (_SHEET, name) at the start of each sheet and
+    (_ROWS, row, repeats) for rows. Runs of empty rows are held back until a row with content shows they aren't
+    trailing.
+    """
+    def __init__(self, formulas):
+        self.formulas = formulas
+        self.events = []
+        self.table_depth = 0
+        self.ignore_depth = 0
+        self.row = None
+        self.row_repeats = 1
+        self.empty_rows = 0
+        self.in_cell = False
+        self.cell = None
+        self.cell_repeats = 1
+        self.empty_cells = 0
+        self.paragraphs = None
+
+    def start_element(self, name, attrs):
+        if self.ignore_depth:
+            self.ignore_depth += 1
+        elif name == _CELL or name == _COVERED_CELL:
+            if self.table_depth == 1 and self.row is not None:
+                self.start_cell(attrs)
+        elif name == _ROW:
+            if self.table_depth == 1:
+                self.row = []
+                self.empty_cells = 0
+                self.row_repeats = int(attrs.get(_ROWS_REPEATED, 1))
+        elif name == _TABLE:
+            self.table_depth += 1
+            if self.table_depth == 1:
+                self.events.append((_SHEET, attrs.get(_NAME)))
+                self.empty_rows = 0
+        elif self.in_cell:
+            if name == _ANNOTATION:
+                # Comments have paragraphs of their own, which aren't part of the value.
+                self.ignore_depth = 1
+            elif self.paragraphs is None:
+                pass
+            elif name in _PARAGRAPHS:
+                self.paragraphs.append([])
+            elif not self.paragraphs:
+                pass
+            elif name == _SPACE:
+                self.paragraphs[-1].append(" " * int(attrs.get(_SPACE_COUNT, 1)))
+            elif name == _TAB:
+                self.paragraphs[-1].append("\t")
+            elif name == _LINE_BREAK:
+                self.paragraphs[-1].append("\n")
+
+    def start_cell(self, attrs):
+        self.in_cell = True
+        self.paragraphs = None
+        self.cell_repeats = int(attrs.get(_COLUMNS_REPEATED, 1))
+        value_type = attrs.get(_VALUE_TYPE)
+        if self.formulas and _FORMULA in attrs:
+            self.cell = attrs[_FORMULA]
+        elif value_type == "string":
+            self.cell = attrs.get(_STRING_VALUE)
+            if self.cell is None:
+                self.paragraphs = []
+        elif value_type in _VALUES:
+            attribute, parse = _VALUES[value_type]
+            self.cell = parse(attrs[attribute])
+        else:
+            self.cell = None
+
+    def characters(self, content):
+        if self.paragraphs and not self.ignore_depth:
+            self.paragraphs[-1].append(content)
+
+    def end_element(self, name):
+        if self.ignore_depth:
+            self.ignore_depth -= 1
+        elif name == _CELL or name == _COVERED_CELL:
+            if self.in_cell and self.table_depth == 1:
+                self.end_cell()
+        elif name == _ROW:
+            if self.row is not None and self.table_depth == 1:
+                self.end_row()
+        elif name == _TABLE:
+            self.table_depth -= 1
+
+    def end_cell(self):
+        if self.paragraphs is not None:
+            value = "\n".join("".join(paragraph) for paragraph in self.paragraphs)
+        else:
+            value = self.cell
+        self.in_cell = False
+        self.cell = None
+        self.paragraphs = None
+        if value is None:
+            self.empty_cells += self.cell_repeats
+        else:
+            if self.empty_cells:
+                self.row.extend([None] * self.empty_cells)
+                self.empty_cells = 0
+            if self.cell_repeats == 1:
+                self.row.append(value)
+            else:
+                self.row.extend([value] * self.cell_repeats)
+
+    def end_row(self):
+        if self.row:
+            if self.empty_rows:
+                self.events.append((_ROWS, [], self.empty_rows))
+                self.empty_rows = 0
+            self.events.append((_ROWS, self.row, self.row_repeats))
+        else:
+            self.empty_rows += self.row_repeats
+        self.row = None
+
+
+def _content(odsfile):
+    """
+    :return: A binary file of the content of odsfile: content.xml of a zipped spreadsheet, or all of a flat one.
+    """
+    if zipfile.is_zipfile(odsfile):
+        zipf = zipfile.ZipFile(odsfile)
+        return zipf, zipf.open("content.xml")
+    if hasattr(odsfile, "read"):
+        odsfile.seek(0)
+        return None, odsfile
+    return None, open(odsfile, "rb")
+
+
+def _events(odsfile, formulas):
+    zipf, content = _content(odsfile)
+    owned = zipf is not None or not hasattr(odsfile, "read")
+    handler = _Handler(formulas)
+    # expat is used directly rather than through xml.sax, whose wrappers cost more than the parsing itself.
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start_element
+    parser.EndElementHandler = handler.end_element
+    parser.CharacterDataHandler = handler.characters
+    try:
+        while True:
+            data = content.read(CHUNK_SIZE)
+            parser.Parse(data, not data)
+            events, handler.events = handler.events, []
+            for event in events:
+                yield event
+            if not data:
+                break
+    finally:
+        if owned:
+            content.close()
+        if zipf is not None:
+            zipf.close()
+
+
+def iter_sheets(odsfile, formulas=False):
+    """
+    Reads the sheets of a spreadsheet in order. Like itertools.groupby, the rows of a sheet must be read before moving
+    on to the next sheet; rows that weren't read are skipped.
+    :param odsfile: Path or seekable binary file of an .ods or .fods spreadsheet.
+    :param formulas: Return the formula (e.g. "of:=SUM([.A1:.A3])") of cells that have one, instead of their value.
+    :return: Generator of (name, rows) tuples, rows is a generator of lists of cells.
+    """
+    events = _events(odsfile, formulas)
+    following = [next(events, None)]
+
+    def rows():
+        for event in events:
+            if event[0] == _SHEET:
+                following[0] = event
+                return
+            row, repeats = event[1], event[2]
+            for _ in range(repeats):
+                yield list(row)
+
+    while following[0] is not None:
+        name = following[0][1]
+        following[0] = None
+        sheet_rows = rows()
+        yield name, sheet_rows
+        for _ in sheet_rows:
+            pass
+
+
+def iter_rows(odsfile, sheet=None, formulas=False):
+    """
+    Reads the rows of one sheet of a spreadsheet.
+    :param odsfile: Path or seekable binary file of an .ods or .fods spreadsheet.
+    :param sheet: Name of the sheet, by default the first sheet.
+    :param formulas: See iter_sheets.
+    :return: Generator of lists of cells.
+    """
+    for name, rows in iter_sheets(odsfile, formulas):
+        if sheet is None or name == sheet:
+            for row in rows:
+                yield row
+            return
+    if sheet is not None:
+        raise KeyError("There is no sheet named {!r}.".format(sheet))
+
+
+def verify(odsfile):
+    """
+    Checks that a zipped spreadsheet is intact and that its XML is well formed, reading every row.
+    :param odsfile: Path or seekable binary file of an .ods spreadsheet.
+    :return: A list of (name, number of rows) tuples, one for each sheet.
+    """
+    with zipfile.ZipFile(odsfile) as zipf:
+        infos = zipf.infolist()
+        if not infos or infos[0].filename != "mimetype" or infos[0].compress_type != zipfile.ZIP_STORED:
+            raise ValueError("The first file in the archive must be an uncompressed mimetype.")
+        if zipf.read("mimetype").decode("utf-8") != ods_components.mimetype:
+            raise ValueError("The mimetype is not that of a spreadsheet.")
+        broken = zipf.testzip()
+        if broken is not None:
+            raise ValueError("{} is corrupt.".format(broken))
+        for name in ("META-INF/manifest.xml", "styles.xml"):
+            with zipf.open(name) as member:
+                expat.ParserCreate().ParseFile(member)
+    return [(name, sum(1 for _ in rows)) for name, rows in iter_sheets(odsfile)]
@@ -0,0 +1,436 @@
+from __future__ import unicode_literals
+import collections
+import decimal
+import datetime
+import sys
+
+from .formula import Formula, CompiledFormula
+from .formatting import INFINITIES, format_decimal, format_number, format_duration, format_time
+from .styles import Cell
+
+# Python 3.13 changed how minidom escapes: quotes are no longer escaped in text, and tabs and line breaks are escaped
+# in attributes.
+_ESCAPE_QUOTES_IN_TEXT = sys.version_info < (3, 13)
+
+
+def escape_text(data):
+    """
+    Escapes text for use as the content of an element in content.xml, exactly as xml.dom.minidom does.
+    :param data: Text to escape.
+    :return: Escaped text.
+    """
+    data = data.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if _ESCAPE_QUOTES_IN_TEXT:
+        data = data.replace("\"", "&quot;")
+    return data
+
+
+def escape_attribute(data):
+    """
+    Escapes text for use as an attribute value in content.xml. Tabs and line breaks are escaped so that readers don't
+    normalise them to spaces. This matches xml.dom.minidom from Python 3.13; older versions leave them as they are.
+    :param data: Text to escape.
+    :return: Escaped text.
+    """
+    data = data.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\"", "&quot;")
+    if "\t" in data or "\n" in data or "\r" in data:
+        data = data.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#9;")
+    return data
+
+
+def _cell(attributes, text):
+    if text:
+        return "<table:table-cell{}><text:p>{}</text:p></table:table-cell>".format(attributes, escape_text(text))
+    return "<table:table-cell{}/>".format(attributes)
+
+
+def _encode_any(cell_data):
+    """
+    The general case, used for subclasses of the supported types and for unknown types.
+    """
+    if isinstance(cell_data, (datetime.date, datetime.datetime)):
+        date_str = cell_data.isoformat()
+        return _cell(' office:value-type="date" office:date-value="{}" table:style-name="cDateISO"'.format(
+            escape_attribute(date_str)), date_str)
+
+    elif isinstance(cell_data, datetime.time):
+        return _cell(' office:value-type="time" office:time-value="{}" table:style-name="cTime"'.format(
+            format_duration(cell_data)), format_time(cell_data))
+
+    elif isinstance(cell_data, bool):
+        # Bool condition must be checked before numeric because:
+        # isinstance(True, int): True
+        # isinstance(True, bool): True
+        return _cell(' office:value-type="boolean" office:boolean-value="{}" table:style-name="cBool"'.format(
+            "true" if cell_data else "false"), "TRUE" if cell_data else "FALSE")
+
+    elif isinstance(cell_data, (float, int, decimal.Decimal)):
+        float_str = format_number(cell_data)
+        if float_str is None:
+            return EMPTY_CELL  # NaN
+        return _cell(' office:value-type="float" office:value="{}"'.format(escape_attribute(float_str)), float_str)
+
+    elif isinstance(cell_data, Formula):
+        return _cell(' table:formula="{}"'.format(escape_attribute(str(cell_data))), None)
+
+    elif cell_data is None:
+        return EMPTY_CELL  # Empty element
+
+    else:
+        # String and unknown types become string cells
+        return _cell(' office:value-type="string"', str(cell_data))
+
+
+# Pre-rendered fragments for the fast paths below. The text of numbers, dates and times never needs escaping.
+
+EMPTY_CELL = "<table:table-cell/>"
+_P_END = "</text:p></table:table-cell>"
+_STRING_START = '<table:table-cell office:value-type="string"><text:p>'
+_EMPTY_STRING = '<table:table-cell office:value-type="string"/>'
+_FLOAT_START = '<table:table-cell office:value-type="float" office:value="'
+_DATE_START = '<table:table-cell office:value-type="date" office:date-value="'
+_DATE_END = '" table:style-name="cDateISO"><text:p>'
+_TIME_START = '<table:table-cell office:value-type="time" office:time-value="'
+_TIME_END = '" table:style-name="cTime"><text:p>'
+_TRUE = ('<table:table-cell office:value-type="boolean" office:boolean-value="true" table:style-name="cBool">'
+         '<text:p>TRUE</text:p></table:table-cell>')
+_FALSE = ('<table:table-cell office:value-type="boolean" office:boolean-value="false" table:style-name="cBool">'
+          '<text:p>FALSE</text:p></table:table-cell>')
+_FORMULA_START = '<table:table-cell table:formula="'
+
+
+def float_cell(float_str):
+    """
+    :param float_str: A number, already formatted.
+    :return: A serialised float cell.
+    """
+    return _FLOAT_START + float_str + '"><text:p>' + float_str + _P_END
+
+
+def date_cell(date_str):
+    """
+    :param date_str: A date or date and time, already formatted in ISO 8601.
+    :return: A serialised date cell.
+    """
+    return _DATE_START + date_str + _DATE_END + date_str + _P_END
+
+
+def bool_cell(cell_data):
+    """
+    :return: A serialised boolean cell.
+    """
+    return _TRUE if cell_data else _FALSE
+
+
+# Serialised string cells are cached, so that columns of repeated values (statuses, countries, currencies...) cost a
+# dictionary lookup rather than escaping. Only short strings are cached, as long ones rarely repeat. When the cache is
+# full, the oldest entry is evicted. The caches are OrderedDicts because removing the first key of a dict over and over
+# gets slower and slower, as iterating from the start has to skip the deleted entries.
+STRING_CACHE_SIZE = 10000
+STRING_CACHE_MAX_LENGTH = 64
+
+_string_cells = collections.OrderedDict()
+_string_cache_size = STRING_CACHE_SIZE
+
+
+def set_string_cache_size(maxsize):
+    """
+    Changes how many serialised string cells are cached. This also clears the cache.
+    :param maxsize: Maximum number of strings, 0 disables the cache.
+    """
+    global _string_cache_size
+    _string_cache_size = maxsize
+    _string_cells.clear()
+
+
+def _encode_string(cell_data):
+    part = _string_cells.get(cell_data)
+    if part is not None:
+        return part
+    if cell_data:
+        part = _STRING_START + escape_text(cell_data) + _P_END
+    else:
+        part = _EMPTY_STRING
+    if len(cell_data) <= STRING_CACHE_MAX_LENGTH and _string_cache_size:
+        if len(_string_cells) >= _string_cache_size:
+            _string_cells.popitem(last=False)
+        _string_cells[cell_data] = part
+    return part
+
+
+def _encode_int(cell_data):
+    float_str = str(cell_data)
+    return _FLOAT_START + float_str + '"><text:p>' + float_str + _P_END
+
+
+def _encode_float(cell_data):
+    # format_float, inlined. Only exact floats come here, so repr is safe.
+    float_str = repr(cell_data)
+    if float_str[-1] in "fn":
+        float_str = INFINITIES.get(float_str)
+        if float_str is None:
+            return EMPTY_CELL
+    return _FLOAT_START + float_str + '"><text:p>' + float_str + _P_END
+
+
+def _encode_decimal(cell_data):
+    float_str = format_decimal(cell_data)
+    if float_str is None:
+        return EMPTY_CELL
+    return _FLOAT_START + float_str + '"><text:p>' + float_str + _P_END
+
+
+# Serialised date cells are cached too, as exports tend to repeat a small number of dates. Datetimes and times, which
+# rarely repeat, are not.
+DATE_CACHE_SIZE = 4096
+
+_date_cells = collections.OrderedDict()
+
+
+def _encode_date(cell_data):
+    part = _date_cells.get(cell_data)
+    if part is None:
+        date_str = cell_data.isoformat()
+        part = _DATE_START + date_str + _DATE_END + date_str + _P_END
+        if len(_date_cells) >= DATE_CACHE_SIZE:
+            _date_cells.popitem(last=False)
+        _date_cells[cell_data] = part
+    return part
+
+
+def _encode_datetime(cell_data):
+    date_str = cell_data.isoformat()
+    return _DATE_START + date_str + _DATE_END + date_str + _P_END
+
+
+def _encode_time(cell_data):
+    return _TIME_START + format_duration(cell_data) + _TIME_END + format_time(cell_data) + _P_END
+
+
+def _encode_formula(cell_data):
+    return _FORMULA_START + escape_attribute(str(cell_data)) + '"/>'
+
+
+def _encode_none(cell_data):
+    return EMPTY_CELL
+
+
+def style_cell(part, style):
+    """
+    Applies a style to a serialised cell, putting table:style-name where the DOM writer's setAttribute would.
+    :param part: A serialised cell.
+    :param style: Style object.
+    :return: The serialised cell with the style.
+    """
+    # Text and attributes never contain a bare ">", so the first one ends the start tag. Only the start tag is
+    # searched, as the text of the cell may contain anything.
+    end = part.index(">")
+    start = part.find(' table:style-name="', 0, end)
+    if start != -1:
+        start += 19
+        end = part.index('"', start)
+        return part[:start] + style.names.get(part[start:end], style.name) + part[end:]
+    if part[end - 1] == "/":
+        end -= 1
+    return part[:end] + ' table:style-name="' + style.name + '"' + part[end:]
+
+
+def _encode_styled(cell_data):
+    return style_cell(encode_cell(cell_data.value), cell_data.style)
+
+
+# Encoders keyed on the exact type of a value. Other types are added as they are first seen, see encoder_for.
+_ENCODERS = {
+    str: _encode_string,
+    int: _encode_int,
+    float: _encode_float,
+    decimal.Decimal: _encode_decimal,
+    bool: bool_cell,
+    datetime.date: _encode_date,
+    datetime.datetime: _encode_datetime,
+    datetime.time: _encode_time,
+    Formula: _encode_formula,
+    CompiledFormula: _encode_formula,
+    Cell: _encode_styled,
+    type(None): _encode_none,
+}
+
+
+def encoder_for(cls):
+    """
+    :param cls: A type of cell value.
+    :return: The function which serialises values of exactly that type.
+    """
+    try:
+        return _ENCODERS[cls]
+    except KeyError:
+        _ENCODERS[cls] = _encode_any
+        return _encode_any
+
+
+def encode_cell(cell_data):
+    """
+    Serialises a single value into a table:table-cell element.
+    :param cell_data: Value of the cell (most basic Python types supported).
+    :return: XML text for the cell.
+    """
+    return (_ENCODERS.get(type(cell_data)) or encoder_for(type(cell_data)))(cell_data)
+
+
+def collapse_cells(parts):
+    """
+    Merges runs of identical cells into one cell with table:number-columns-repeated. Formula cells are left alone, so
+    that spreadsheet applications never have to adjust a formula for the position of a repeat.
+    :param parts: A list of serialised cells.
+    :return: A list of serialised cells.
+    """
+    collapsed = []
+    previous = None
+    repeats = 0
+    for part in parts:
+        if part == previous and not part.startswith(_FORMULA_START):
+            repeats += 1
+            continue
+        if repeats > 1:
+            collapsed[-1] = repeat_cell(previous, repeats)
+        collapsed.append(part)
+        previous = part
+        repeats = 1
+    if repeats > 1:
+        collapsed[-1] = repeat_cell(previous, repeats)
+    return collapsed
+
+
+def repeat_cell(part, repeats):
+    """
+    :return: The serialised cell part, marked as being repeated across repeats columns.
+    """
+    return '<table:table-cell table:number-columns-repeated="{}"{}'.format(repeats, part[17:])
+
+
+def repeat_row(row, repeats):
+    """
+    :return: The serialised row, marked as being repeated down repeats rows.
+    """
+    if repeats == 1:
+        return row
+    return '<table:table-row table:number-rows-repeated="{}"{}'.format(repeats, row[16:])
+
+
+def _row(parts, collapse):
+    if not parts:
+        return "<table:table-row/>"
+    if collapse:
+        parts = collapse_cells(parts)
+    return "<table:table-row>{}</table:table-row>".format("".join(parts))
+
+
+def encode_row(cells, cols=None, collapse=False):
+    """
+    Serialises a row of values into a table:table-row element, padding it with empty cells up to cols.
+    :param cells: A list of cells (most basic Python types supported).
+    :param cols: Optional number of columns to pad the row to.
+    :param collapse: Merge runs of identical cells, see collapse_cells.
+    :return: XML text for the row.
+    """
+    get = _ENCODERS.get
+    return join_row([(get(type(cell_data)) or encoder_for(type(cell_data)))(cell_data) for cell_data in cells],
+                    cols, collapse)
+
+
+def encode_rows(rows, cols=None, collapse=False):
+    """
+    Serialises a batch of rows, as encode_row does one row, into a single string. The cells of all the rows are
+    gathered into one list and joined once, rather than building a string for each row.
+    :param rows: A list of rows, rows are lists of cells.
+    :param cols: Optional number of columns to pad rows to.
+    :param collapse: Merge runs of identical cells, see collapse_cells.
+    :return: XML text for the rows.
+    """
+    if cols is not None or collapse:
+        return "".join([encode_row(cells, cols, collapse) for cells in rows])
+    get = _ENCODERS.get
+    parts = []
+    append = parts.append
+    extend = parts.extend
+    for cells in rows:
+        if cells:
+            append("<table:table-row>")
+            extend([(get(type(cell_data)) or encoder_for(type(cell_data)))(cell_data) for cell_data in cells])
+            append("</table:table-row>")
+        else:
+            append("<table:table-row/>")
+    return "".join(parts)
+
+
+def join_row(parts, cols=None, collapse=False):
+    """
+    Joins serialised cells into a table:table-row element, padding it with empty cells up to cols.
+    :param parts: A list of serialised cells.
+    :param cols: Optional number of columns to pad the row to.
+    :param collapse: Merge runs of identical cells, see collapse_cells.
+    :return: XML text for the row.
+    """
+    if cols is not None:
+        if len(parts) > cols:
+            raise Exception("More cells than cols.")
+        parts.extend([EMPTY_CELL] * (cols - len(parts)))
+
+    return _row(parts, collapse)
+
+
+def row_encoder(schema, cols=None, collapse=False):
+    """
+    Compiles a function which serialises rows whose columns have a fixed type, skipping the encoder lookup that
+    encode_row does for every cell.
+    :param schema: A list with the type of each column, e.g. [str, decimal.Decimal, datetime.date, int]. Cells of any
+                   other type, including None and subclasses, are serialised by encode_cell. A column with type None
+                   has its type detected as usual.
+    :param cols: Optional number of columns to pad rows to, as for encode_row. It can't be less than the number of
+                 columns in the schema. Rows may have cells beyond the schema up to cols, without cols they can't.
+    :param collapse: Merge runs of identical cells, see collapse_cells.
+    :return: A function which takes a row (a list or tuple of cells) and returns XML text for the row.
+    """
+    if cols is not None and len(schema) > cols:
+        raise ValueError("Schema has more columns than cols.")
+    encoders = [encode_cell if cls is None else encoder_for(cls) for cls in schema]
+    width = len(encoders)
+    padding = [] if cols is None else [EMPTY_CELL] * (cols - width)
+
+    def encode(cells):
+        parts = [encoder(cell_data) if type(cell_data) is cls else encode_cell(cell_data)
+                 for cls, encoder, cell_data in zip(schema, encoders, cells)]
+        if len(cells) > width:
+            if cols is None:
+                raise Exception("More cells than columns in the schema.")
+            if len(cells) > cols:
+                raise Exception("More cells than cols.")
+            # Cells beyond the schema, which cols leaves room for, have their type detected as usual.
+            parts.extend([encode_cell(cell_data) for cell_data in cells[width:]])
+            parts.extend([EMPTY_CELL] * (cols - len(cells)))
+        elif cols is not None:
+            parts.extend(padding)
+            parts.extend([EMPTY_CELL] * (width - len(cells)))
+        return _row(parts, collapse)
+
+    return encode
+
+
+def table_attributes(name):
+    """
+    :param name: Optional name for the sheet.
+    :return: Attributes of a table:table element, in the same order as the DOM writer uses.
+    """
+    if name:
+        return ' table:name="{}" table:style-name="ta1"'.format(escape_attribute(name))
+    return ' table:style-name="ta1"'
+
+
+def column_element(cols):
+    """
+    :param cols: Number of columns, may be None.
+    :return: The table:table-column element declaring the columns of a table, or an empty string.
+    """
+    if cols is None:
+        return ""
+    return '<table:table-column table:number-columns-repeated="{}"/>'.format(cols)
@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+import queue
+import sys
+import threading
+
+# Rows are fetched in batches of this many rows, and up to PREFETCH_BATCHES batches are held at a time.
+PREFETCH_SIZE = 1000
+PREFETCH_BATCHES = 4
+
+_DONE = object()
+
+
+def prefetch(rows, size=PREFETCH_SIZE, batches=PREFETCH_BATCHES):
+    """
+    Reads rows from an iterable on a background thread, so that fetching them (for example from a database cursor)
+    overlaps with serialising and compressing the rows already fetched. At most size * batches rows are held at once.
+    Exceptions raised by the iterable are raised again by this generator. The iterable must be safe to use from another
+    thread, which isn't the case for some database drivers, sqlite3 among them.
+    :param rows: Iterable of rows.
+    :return: Generator of rows.
+    """
+    fetched = queue.Queue(batches)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up if the generator has been closed, rather than waiting forever on a full queue.
+        while not stop.is_set():
+            try:
+                fetched.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch():
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch and not put(batch):
+                return
+            put(_DONE)
+        except BaseException:
+            put(sys.exc_info()[1])
+
+    thread = threading.Thread(target=fetch, name="odswriter-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = fetched.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            for row in batch:
+                yield row
+    finally:
+        stop.set()
+        thread.join()
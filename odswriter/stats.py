@@ -0,0 +1,91 @@
+from __future__ import unicode_literals
+import collections
+import time
+
+PHASES = ("encode", "serialize", "compress")
+
+
+class WriterStats(object):
+    """
+    Counters and timings for an ODSWriter, for finding out where a slow export spends its time. Pass an instance to
+    ODSWriter(..., stats=WriterStats()). Recording them costs a few timer calls per row, so they can be left on.
+
+    rows: Number of rows written.
+    cells: Number of cells written, by type name.
+    members: Uncompressed and compressed size of each zip member, filled in at close.
+    phases: Seconds spent in each phase. encode is turning rows into XML (or DOM nodes), serialize is turning that
+            into UTF-8 bytes and compress is writing those into the zip file.
+    """
+    def __init__(self, callback=None):
+        """
+        :param callback: Optional function which is called with this object when the writer is closed, for example to
+                         feed a metrics system.
+        """
+        self.callback = callback
+        self.rows = 0
+        self._cells = collections.Counter()
+        self.members = {}
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    @property
+    def cells(self):
+        counts = collections.Counter()
+        for cls, count in self._cells.items():
+            counts[cls if isinstance(cls, str) else cls.__name__] += count
+        return counts
+
+    def count_row(self, cells):
+        self.rows += 1
+        self._cells.update(map(type, cells))
+
+    def count_columns(self, columns):
+        """
+        Counts the cells of columnar data, by the dtype of each column.
+        """
+        if columns:
+            self.rows += len(columns[0])
+        for column in columns:
+            dtype = getattr(column, "dtype", None)
+            self._cells[str(dtype) if dtype is not None else "column"] += len(column)
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def timer(self, phase):
+        """
+        :return: A context manager which adds the time spent in it to phase.
+        """
+        return _Timer(self, phase)
+
+    def finish(self, zipf):
+        """
+        Records the sizes of the zip members and calls the callback. Called by ODSWriter.close.
+        :param zipf: The ZipFile written, or None for a flat spreadsheet.
+        """
+        for info in zipf.infolist() if zipf is not None else ():
+            self.members[info.filename] = {"bytes": info.file_size, "compressed_bytes": info.compress_size}
+        if self.callback is not None:
+            self.callback(self)
+
+    def as_dict(self):
+        """
+        :return: The counters and timings as a dictionary, suitable for JSON.
+        """
+        return {
+            "rows": self.rows,
+            "cells": dict(self.cells),
+            "members": dict(self.members),
+            "phases": dict(self.phases),
+        }
+
+
+class _Timer(object):
+    def __init__(self, stats, phase):
+        self.stats = stats
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.stats.phases[self.phase] += time.perf_counter() - self.start
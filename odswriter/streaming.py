@@ -0,0 +1,557 @@
+from __future__ import unicode_literals
+import codecs
+import collections
+import io
+import itertools
+import tempfile
+import time
+
+from . import ods_components
+from .compression import open_member
+from . import columnar
+from .serializer import encode_row, encode_rows, join_row, row_encoder, repeat_row, table_attributes, column_element
+from .widths import ColumnWidths, columns_xml
+
+# Rows are gathered into chunks of roughly this many characters before being handed to the zip member.
+CHUNK_SIZE = 64 * 1024
+
+# Sheets that have to be buffered are kept in memory up to this many bytes, then moved to a temporary file.
+SPILL_THRESHOLD = 4 * 1024 * 1024
+
+# With worker processes, rows are sent to the workers in batches of this many rows.
+BATCH_SIZE = 1000
+
+# Row encoders compiled for schemas in this process, see _encode_batch.
+_schema_encoders = {}
+
+
+# The content.xml skeleton, split by content_chunks.
+_content_chunks = None
+
+
+def content_chunks():
+    """
+    Splits the content.xml skeleton around the point where tables are inserted, so that the streaming writer produces
+    the same bytes as the DOM writer would. The skeleton is parsed and split once, the first time it's needed.
+    :return: (prefix, suffix) tuple of strings.
+    """
+    global _content_chunks
+    if _content_chunks is None:
+        from xml.dom.minidom import parseString
+        xml = parseString(ods_components.content_xml).toxml()
+        split = xml.index("</office:spreadsheet>")
+        _content_chunks = xml[:split], xml[split:]
+    return _content_chunks
+
+
+def flat_chunks(styles):
+    """
+    Splits a flat OpenDocument spreadsheet (.fods), which holds the styles and content in one document, around the
+    point where tables are inserted.
+    :param styles: StyleRegistry of the styles to include.
+    :return: (prefix, suffix) tuple of strings.
+    """
+    prefix, suffix = content_chunks()
+    styles_xml = styles.styles_xml(ods_components.styles_xml)
+    office_styles = styles_xml[styles_xml.index("<office:styles>"):styles_xml.index("</office:styles>") + 16]
+    prefix = prefix.replace("<office:document-content ", '<office:document office:mimetype="{}" '.format(
+        ods_components.mimetype), 1)
+    prefix = prefix.replace("<office:automatic-styles>", office_styles + "\n    <office:automatic-styles>", 1)
+    return prefix, suffix.replace("</office:document-content>", "</office:document>")
+
+
+def _encode_batch(rows, cols, schema, collapse):
+    """
+    Serialises a batch of rows. This runs in the worker processes, so the arguments have to be picklable.
+    :return: A list of serialised rows if collapse is set, as identical rows are merged by the sheet. Otherwise the
+             serialised rows joined into one string, which is far cheaper to send back than a list.
+    """
+    if schema is None:
+        if not collapse:
+            return encode_rows(rows, cols)
+        return [encode_row(cells, cols, collapse) for cells in rows]
+    key = (tuple(schema), cols, collapse)
+    try:
+        encode = _schema_encoders[key]
+    except KeyError:
+        encode = _schema_encoders[key] = row_encoder(schema, cols, collapse)
+    if not collapse:
+        return "".join([encode(cells) for cells in rows])
+    return [encode(cells) for cells in rows]
+
+
+class _ChunkedWriter(object):
+    """
+    Gathers serialised text into chunks of roughly chunk_size characters and passes them on as UTF-8 bytes.
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE, stats=None):
+        self.chunk_size = chunk_size
+        self.stats = stats
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            if self.stats is None:
+                data = "".join(self._buffer).encode("utf-8")
+            else:
+                with self.stats.timer("serialize"):
+                    data = "".join(self._buffer).encode("utf-8")
+            self.write_bytes(data)
+            self._buffer = []
+            self._buffered = 0
+
+    def write_bytes(self, data):
+        raise NotImplementedError
+
+
+class SpillBuffer(_ChunkedWriter):
+    """
+    Holds the serialised rows of a sheet that can't be streamed into content.xml yet because an earlier sheet is still
+    open. Rows are kept in memory up to threshold bytes, after which they spill over into a temporary file.
+    """
+    def __init__(self, threshold=SPILL_THRESHOLD, chunk_size=CHUNK_SIZE, stats=None):
+        super(SpillBuffer, self).__init__(chunk_size, stats)
+        self.file = tempfile.SpooledTemporaryFile(max_size=threshold)
+
+    def write_bytes(self, data):
+        self.file.write(data)
+
+    def copy_to(self, target):
+        """
+        Writes everything buffered so far into target and releases the buffer.
+        """
+        self.flush()
+        self.file.seek(0)
+        while True:
+            data = self.file.read(self.chunk_size)
+            if not data:
+                break
+            target.write_bytes(data)
+        self.close()
+
+    def close(self):
+        """
+        Releases the buffer without writing it anywhere.
+        """
+        self.file.close()
+
+
+class ContentStream(_ChunkedWriter):
+    """
+    Writes content.xml incrementally into the zip file, so that only a small buffer of rows is ever held in memory.
+
+    The first sheet is streamed straight into content.xml. Any other sheets are kept in their own SpillBuffer until
+    the sheets before them are finished, which means sheets can still be written to in any order. Sheets that are
+    written one after another and finished when complete are all streamed without buffering.
+
+    If workers is given, rows are serialised in that many worker processes, with up to 2 batches per worker in flight
+    for each sheet. If compress_threads is given, content.xml is deflated on that many threads. If stats is given, it
+    is a WriterStats which counters and timings are recorded in.
+
+    If column_styles is given, it is a ColumnStyles and the columns of each sheet are sized to fit their values. The
+    widths aren't known until the sheets are finished, and the column styles go near the start of content.xml, so
+    then every sheet is buffered and content.xml is only written on close.
+    """
+    def __init__(self, zipf, spill_threshold=SPILL_THRESHOLD, collapse_repeated=False, workers=None,
+                 compress_threads=None, stats=None, chunk_size=CHUNK_SIZE, column_styles=None):
+        super(ContentStream, self).__init__(chunk_size, stats)
+        self.column_styles = column_styles
+        self.zipf = zipf
+        self.compress_threads = compress_threads
+        self.spill_threshold = spill_threshold
+        self.collapse_repeated = collapse_repeated
+        if workers is None:
+            self.pool = None
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(workers)
+        self.max_pending = 0 if workers is None else workers * 2
+        self.prefix, self.suffix = content_chunks()
+        self.sheets = []
+        # The index of the sheet which is streamed straight into content.xml.
+        self.head = 0
+        self._stream = None
+
+    def write_bytes(self, data):
+        if self._stream is None:
+            self._stream = self._open()
+        if self.stats is None:
+            self._stream.write(data)
+        else:
+            with self.stats.timer("compress"):
+                self._stream.write(data)
+
+    def _open(self):
+        stream = open_member(self.zipf, "content.xml", self.compress_threads)
+        stream.write(self._prefix().encode("utf-8"))
+        return stream
+
+    def _prefix(self):
+        if self.column_styles is None:
+            return self.prefix
+        return self.column_styles.add_to(self.prefix)
+
+    def add_sheet(self, sheet):
+        """
+        :return: The writer that rows of sheet should be written to.
+        """
+        self.sheets.append(sheet)
+        if self.head == len(self.sheets) - 1 and self.column_styles is None:
+            return self
+        return SpillBuffer(self.spill_threshold, self.chunk_size, self.stats)
+
+    def sheet_finished(self, sheet):
+        """
+        Called when a sheet is finished. Once the sheet that is being streamed is finished, the rows buffered for the
+        next sheet are copied in and that sheet is streamed from then on.
+        """
+        if self.column_styles is not None:
+            return
+        while self.head < len(self.sheets) and self.sheets[self.head].finished:
+            self.head += 1
+            if self.head < len(self.sheets):
+                following = self.sheets[self.head]
+                if following.out is not self:
+                    self.flush()
+                    following.out.copy_to(self)
+                    following.out = self
+
+    def close(self):
+        try:
+            for sheet in self.sheets:
+                sheet.finish()
+            if self.column_styles is not None:
+                self._write_sized_sheets()
+            self.write(self.suffix)
+            self.flush()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+            if self._stream is not None:
+                if self.stats is None:
+                    self._stream.close()
+                else:
+                    with self.stats.timer("compress"):
+                        self._stream.close()
+            for sheet in self.sheets:
+                if isinstance(sheet.out, SpillBuffer):
+                    sheet.out.close()
+
+    def _write_sized_sheets(self):
+        # The sheets were buffered without their table tags, which can be written now that the widths are known. All
+        # the column styles must be known before the start of content.xml is written.
+        runs = [self.column_styles.runs(sheet.widths, sheet.cols) for sheet in self.sheets]
+        for sheet, sheet_runs in zip(self.sheets, runs):
+            columns = columns_xml(sheet_runs)
+            if not columns and not sheet.started:
+                self.write("<table:table{}/>".format(table_attributes(sheet.name)))
+                sheet.out.close()
+                continue
+            self.write("<table:table{}>{}".format(table_attributes(sheet.name), columns))
+            self.flush()
+            sheet.out.copy_to(self)
+            self.write("</table:table>")
+
+
+class _FlatOutput(object):
+    def __init__(self, odsfile):
+        self.owned = not hasattr(odsfile, "write")
+        self.file = open(odsfile, "wb") if self.owned else odsfile
+        # Chunks copied from a SpillBuffer can end part way through a character, so text is decoded incrementally.
+        self.decoder = codecs.getincrementaldecoder("utf-8")() if isinstance(self.file, io.TextIOBase) else None
+
+    def write(self, data):
+        if self.decoder is None:
+            self.file.write(data)
+        else:
+            self.file.write(self.decoder.decode(data))
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class FlatContentStream(ContentStream):
+    """
+    Writes a flat OpenDocument spreadsheet (.fods) straight to a file, without a zip container. The styles come
+    before the content, so they are fixed once the first bytes are written.
+    """
+    def __init__(self, odsfile, styles, spill_threshold=SPILL_THRESHOLD, collapse_repeated=False, workers=None,
+                 stats=None, chunk_size=CHUNK_SIZE, column_styles=None):
+        """
+        :param odsfile: Path, binary file or text file to write to. A text file should use UTF-8.
+        :param styles: StyleRegistry of the spreadsheet.
+        """
+        super(FlatContentStream, self).__init__(None, spill_threshold, collapse_repeated, workers, None, stats,
+                                                chunk_size, column_styles)
+        self.odsfile = odsfile
+        self.styles = styles
+        self.prefix, self.suffix = flat_chunks(styles)
+
+    def _open(self):
+        # Styles may have been added since.
+        self.prefix = flat_chunks(self.styles)[0]
+        stream = _FlatOutput(self.odsfile)
+        stream.write(self._prefix().encode("utf-8"))
+        return stream
+
+
+class ChunkBuffer(object):
+    """
+    A write-only, non-seekable file which holds what is written to it until it is taken. ZipFile writes to this using
+    data descriptors, because it can't seek back to fill in sizes.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        """
+        :return: Everything written since the last call, as bytes.
+        """
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class StreamingSheet(object):
+    """
+    A sheet whose rows are serialised straight to XML text rather than into a DOM.
+
+    If the content stream collapses repeats, identical cells are merged with table:number-columns-repeated and
+    identical consecutive rows with table:number-rows-repeated. A run of rows is held back until a different row
+    arrives or the sheet is finished.
+
+    If the content stream has a pool of worker processes, rows are gathered into batches and serialised there. Errors
+    in a row, such as having more cells than cols, are then raised by a later write or by close.
+
+    If rows is given, it is an iterable of rows which is read when the sheet is finished, after any rows written to
+    the sheet directly.
+
+    If the content stream sizes columns, the sheet keeps the widths of its columns and only its rows are written to
+    its buffer. The content stream writes the table tags around them on close.
+    """
+    def __init__(self, content, name=None, cols=None, schema=None, rows=None):
+        self.content = content
+        self.name = name
+        self.cols = cols
+        self.schema = schema
+        self.rows = rows
+        self.collapse = content.collapse_repeated
+        self._encode_row = None if schema is None else row_encoder(schema, cols, self.collapse)
+        self.stats = content.stats
+        self.widths = None if content.column_styles is None else ColumnWidths()
+        self.finished = False
+        self.started = False
+        self._pending_row = None
+        self._pending_repeats = 0
+        self._batch = []
+        self._futures = collections.deque()
+        self.out = content.add_sheet(self)
+
+    def writerow(self, cells):
+        if self.finished:
+            raise Exception("Sheet has been finished, no more rows can be written to it.")
+        if self.stats is not None:
+            self.stats.count_row(cells)
+        if self.content.pool is not None:
+            # Copy the row, as it won't be serialised until later.
+            self._batch.append(list(cells))
+            if len(self._batch) >= BATCH_SIZE:
+                self._submit_batch()
+        elif self.stats is not None:
+            start = time.perf_counter()
+            row = self._encode(cells)
+            self.stats.add_time("encode", time.perf_counter() - start)
+            self._write_row(row)
+        elif self._encode_row is None:
+            self._write_row(encode_row(cells, self.cols, self.collapse))
+        else:
+            self._write_row(self._encode_row(cells))
+        if self.widths is not None:
+            self.widths.add_row(cells)
+
+    def _encode(self, cells):
+        if self._encode_row is None:
+            return encode_row(cells, self.cols, self.collapse)
+        return self._encode_row(cells)
+
+    def _start(self):
+        if self.widths is None:
+            self.out.write("<table:table{}>{}".format(table_attributes(self.name), column_element(self.cols)))
+        self.started = True
+
+    def _write_row(self, row):
+        if not self.started:
+            self._start()
+        if not self.collapse:
+            self.out.write(row)
+        elif row == self._pending_row and "table:formula=" not in row:
+            self._pending_repeats += 1
+        else:
+            self._write_pending()
+            self._pending_row = row
+            self._pending_repeats = 1
+
+    def _submit_batch(self):
+        self._futures.append(self.content.pool.submit(_encode_batch, self._batch, self.cols, self.schema,
+                                                      self.collapse))
+        self._batch = []
+        while len(self._futures) > self.content.max_pending:
+            self._write_batch(self._futures.popleft())
+
+    def _write_batch(self, future):
+        if not self.collapse:
+            # The whole batch, as one string.
+            self._write_row(future.result())
+            return
+        for row in future.result():
+            self._write_row(row)
+
+    def _write_pending(self):
+        if self._pending_row is not None:
+            self.out.write(repeat_row(self._pending_row, self._pending_repeats))
+            self._pending_row = None
+
+    def writerows(self, rows):
+        if self.content.pool is None:
+            for row in rows:
+                self.writerow(row)
+            return
+        # With worker processes, rows are added to the batch a slice at a time rather than through writerow, as the
+        # work left in this process is mostly per-row overhead.
+        if self.finished:
+            raise Exception("Sheet has been finished, no more rows can be written to it.")
+        rows = iter(rows)
+        while True:
+            # Copy the rows, as they won't be serialised until later.
+            batch = [list(cells) for cells in itertools.islice(rows, BATCH_SIZE - len(self._batch))]
+            if not batch:
+                break
+            if self.stats is not None:
+                for cells in batch:
+                    self.stats.count_row(cells)
+            if self.widths is not None:
+                for cells in batch:
+                    self.widths.add_row(cells)
+            self._batch.extend(batch)
+            if len(self._batch) >= BATCH_SIZE:
+                self._submit_batch()
+
+    def write_batch(self, rows, batch_size=BATCH_SIZE):
+        """
+        Write rows a batch at a time. Each batch is serialised in one go and handed to the output as a single string,
+        which avoids the per-row overhead of writerow in bulk loads. If a row is invalid, such as having more cells
+        than cols, none of the rows in its batch are written.
+        :param rows: An iterable of rows, rows are lists of cells - see writerow.
+        :param batch_size: Number of rows in each batch.
+        :return: Nothing.
+        """
+        if self.content.pool is not None:
+            # Rows are already serialised in batches by the worker processes.
+            self.writerows(rows)
+            return
+        if self.finished:
+            raise Exception("Sheet has been finished, no more rows can be written to it.")
+        encode, cols, collapse = self._encode_row, self.cols, self.collapse
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            if self.stats is not None:
+                for cells in batch:
+                    self.stats.count_row(cells)
+                start = time.perf_counter()
+            if collapse:
+                # Identical rows are merged one row at a time, see _write_row.
+                if encode is None:
+                    encoded = [encode_row(cells, cols, collapse) for cells in batch]
+                else:
+                    encoded = [encode(cells) for cells in batch]
+            elif encode is None:
+                encoded = encode_rows(batch, cols)
+            else:
+                encoded = "".join([encode(cells) for cells in batch])
+            if self.stats is not None:
+                self.stats.add_time("encode", time.perf_counter() - start)
+            if collapse:
+                for row in encoded:
+                    self._write_row(row)
+            else:
+                if not self.started:
+                    self._start()
+                self.out.write(encoded)
+            if self.widths is not None:
+                for cells in batch:
+                    self.widths.add_row(cells)
+
+    def write_columns(self, columns, header=False):
+        """
+        Write columnar data, such as NumPy arrays or a pandas DataFrame, into the sheet. Numeric, boolean and datetime
+        columns are formatted a column at a time rather than cell by cell.
+        :param columns: A mapping of column names to columns, a 2-D NumPy array or a sequence of columns.
+        :param header: If columns is a mapping, write its keys as the first row.
+        :return: Nothing.
+        """
+        names, columns = columnar.split_columns(columns)
+        if header and names is not None:
+            self.writerow(names)
+        if self.stats is not None:
+            self.stats.count_columns(columns)
+        if self.finished:
+            raise Exception("Sheet has been finished, no more rows can be written to it.")
+        # Rows queued for worker processes must be written first.
+        self._write_batches()
+        for parts in columnar.encoded_rows(columns):
+            self._write_row(join_row(parts, self.cols, self.collapse))
+        if self.widths is not None:
+            for index, column in enumerate(columns):
+                self.widths.add_column(index, columnar.python_values(column))
+
+    def _write_batches(self):
+        if self._batch:
+            self._submit_batch()
+        while self._futures:
+            self._write_batch(self._futures.popleft())
+
+    def finish(self):
+        """
+        Closes the table element of the sheet, after which no more rows can be written to it. This is done
+        automatically when the spreadsheet is closed, but finishing a sheet as soon as it is complete lets the sheet
+        after it be streamed straight into the file instead of being buffered.
+        :return: Nothing.
+        """
+        if self.finished:
+            return
+        if self.rows is not None:
+            rows, self.rows = self.rows, None
+            self.writerows(rows)
+        self._write_batches()
+        if self.widths is not None:
+            self._write_pending()
+        elif self.started:
+            self._write_pending()
+            self.out.write("</table:table>")
+        elif self.cols is None:
+            self.out.write("<table:table{}/>".format(table_attributes(self.name)))
+        else:
+            self.out.write("<table:table{}>{}</table:table>".format(table_attributes(self.name),
+                                                                  column_element(self.cols)))
+        self.finished = True
+        self.content.sheet_finished(self)
@@ -0,0 +1,167 @@
+from __future__ import unicode_literals
+import re
+
+# Number formats in the style of spreadsheet format codes: "0", "0.00", "#,##0.00", "0.0%"...
+_NUMBER_FORMAT = re.compile(r"^(#,##)?0(?:\.(0+))?(%)?$")
+
+# The fixed cell styles of content.xml, and the data style that a cell style replacing each of them needs in order
+# to keep displaying the value the same way.
+_DATA_STYLES = {
+    "cDateISO": "odswriterDateISO",
+    "cTime": "odswriterStyleXMLTime",
+    "cBool": "odswriterBool",
+}
+
+_DATE_ISO_STYLE = """
+        <number:date-style style:name="odswriterDateISO" number:automatic-order="true">
+            <number:year/>
+            <number:text>-</number:text>
+            <number:month number:style="long"/>
+            <number:text>-</number:text>
+            <number:day number:style="long"/>
+        </number:date-style>"""
+
+_BOOL_STYLE = """
+        <number:boolean-style style:name="odswriterBool">
+            <number:boolean/>
+        </number:boolean-style>"""
+
+
+_FO_NAMESPACE = '\n    xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0"'
+
+
+def _attribute(value):
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\"", "&quot;")
+
+
+class Cell(object):
+    """
+    A cell value with a style, made by ODSWriter.add_style. Use it in a row in place of the bare value:
+    odsfile.writerow(["Total", ods.Cell(total, bold)])
+    """
+    __slots__ = ("value", "style")
+
+    def __init__(self, value, style):
+        self.value = value
+        self.style = style
+
+
+class Style(object):
+    """
+    A cell style registered with a StyleRegistry. Dates, times and booleans already have a style which sets how they
+    are displayed, so a style without a number format has a variant for each of them which keeps that display.
+
+    name: Name of the style, as used in table:style-name.
+    names: Name of the variant which replaces each of the fixed cell styles.
+    """
+    def __init__(self, name, names):
+        self.name = name
+        self.names = names
+
+    def __repr__(self):
+        return "Style({!r})".format(self.name)
+
+
+class StyleRegistry(object):
+    """
+    The cell styles of a spreadsheet. Identical combinations of properties share a single style:style element, so
+    styling cells costs nothing in the size of the file however many cells use a style.
+    """
+    def __init__(self):
+        self.styles = []
+        self.number_styles = []
+        self._styles = {}
+        self._number_styles = {}
+
+    def add(self, number_format=None, bold=False, italic=False, color=None, background=None):
+        """
+        :param number_format: Format for numbers, such as "0.00", "#,##0" or "0.0%".
+        :param bold: Bold text.
+        :param italic: Italic text.
+        :param color: Colour of the text, e.g. "#ff0000".
+        :param background: Background colour of the cell.
+        :return: Style object, the same one for the same properties.
+        """
+        properties = (number_format, bool(bold), bool(italic), color, background)
+        try:
+            return self._styles[properties]
+        except KeyError:
+            pass
+        if number_format is None:
+            name = self._add_style(properties, None)
+            names = {fixed: self._add_style(properties, data_style) for fixed, data_style in _DATA_STYLES.items()}
+        else:
+            name = self._add_style(properties, self._number_style(number_format))
+            names = dict.fromkeys(_DATA_STYLES, name)
+        style = self._styles[properties] = Style(name, names)
+        return style
+
+    def _add_style(self, properties, data_style):
+        name = "ce{}".format(len(self.styles) + 1)
+        self.styles.append((name, properties, data_style))
+        return name
+
+    def _number_style(self, number_format):
+        try:
+            return self._number_styles[number_format]
+        except KeyError:
+            pass
+        match = _NUMBER_FORMAT.match(number_format)
+        if match is None:
+            raise ValueError("Unsupported number format {!r}.".format(number_format))
+        grouping, decimals, percent = match.groups()
+        name = "N{}".format(len(self.number_styles) + 1)
+        number = '<number:number number:decimal-places="{}" number:min-integer-digits="1"{}/>'.format(
+            len(decimals or ""), ' number:grouping="true"' if grouping else "")
+        if percent:
+            xml = '<number:percentage-style style:name="{}">{}<number:text>%</number:text></number:percentage-style>'
+        else:
+            xml = '<number:number-style style:name="{}">{}</number:number-style>'
+        self.number_styles.append(xml.format(name, number))
+        self._number_styles[number_format] = name
+        return name
+
+    def definitions(self):
+        """
+        :return: XML text of the style elements, for the office:styles element of styles.xml.
+        """
+        data_styles = set(data_style for _, _, data_style in self.styles)
+        parts = []
+        if "odswriterDateISO" in data_styles:
+            parts.append(_DATE_ISO_STYLE)
+        if "odswriterBool" in data_styles:
+            parts.append(_BOOL_STYLE)
+        for number_style in self.number_styles:
+            parts.append("\n        " + number_style)
+        for name, (_, bold, italic, color, background), data_style in self.styles:
+            parts.append('\n        <style:style style:name="{}" style:family="table-cell" '
+                         'style:parent-style-name="Default"'.format(name))
+            if data_style is not None:
+                parts.append(' style:data-style-name="{}"'.format(data_style))
+            parts.append(">")
+            if background is not None:
+                parts.append('<style:table-cell-properties fo:background-color="{}"/>'.format(_attribute(background)))
+            text = []
+            if bold:
+                text.append(' fo:font-weight="bold"')
+            if italic:
+                text.append(' fo:font-style="italic"')
+            if color is not None:
+                text.append(' fo:color="{}"'.format(_attribute(color)))
+            if text:
+                parts.append("<style:text-properties{}/>".format("".join(text)))
+            parts.append("</style:style>")
+        return "".join(parts)
+
+    def styles_xml(self, template):
+        """
+        :param template: The skeleton of styles.xml.
+        :return: styles.xml with the styles added.
+        """
+        if not self.styles:
+            return template
+        # The formatting properties of the styles need the fo namespace, which the skeleton doesn't declare so that it
+        # is unchanged for spreadsheets without styles.
+        template = template.replace("\n    xmlns:style=", _FO_NAMESPACE + "\n    xmlns:style=", 1)
+        split = template.index("\n    </office:styles>")
+        return template[:split] + self.definitions() + template[split:]
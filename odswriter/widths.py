@@ -0,0 +1,187 @@
+"""
+Column widths for auto_width=True. Each sheet keeps the length of the longest value displayed in each of its columns
+as rows are written, so only one number per column is held however many rows there are. When the spreadsheet is
+closed, the lengths become column widths, and each distinct width a column style in content.xml.
+"""
+from __future__ import unicode_literals
+import datetime
+import decimal
+
+from .formatting import format_decimal
+from .formula import Formula, CompiledFormula
+from .styles import Cell
+
+# Widths in cm for the default font, Liberation Sans 10pt. Columns are never made narrower than the default width of
+# LibreOffice, and very long values (such as paragraphs of notes) are allowed to overflow rather than making a column
+# too wide to work with.
+CHAR_WIDTH = 0.2
+PADDING = 0.25
+MIN_WIDTH = 2.258
+MAX_LENGTH = 60
+
+
+def _text_length(cell_data):
+    if "\n" in cell_data:
+        return max(len(line) for line in cell_data.split("\n"))
+    return len(cell_data)
+
+
+def _float_length(cell_data):
+    # Roughly as many digits as spreadsheet applications show in the General format.
+    return len("%.10g" % cell_data)
+
+
+def _decimal_length(cell_data):
+    return len(format_decimal(cell_data) or "")
+
+
+def _styled_length(cell_data):
+    return display_length(cell_data.value)
+
+
+def _zero(cell_data):
+    # Empty cells, and formulae, whose results aren't known until they are calculated.
+    return 0
+
+
+def display_length(cell_data):
+    """
+    :param cell_data: Value of a cell (most basic Python types supported).
+    :return: The number of characters the value is displayed with in a spreadsheet, roughly.
+    """
+    length = _LENGTHS.get(type(cell_data))
+    if length is not None:
+        return length(cell_data)
+    if isinstance(cell_data, (datetime.date, datetime.datetime)):
+        return 10
+    elif isinstance(cell_data, datetime.time):
+        return 8
+    elif isinstance(cell_data, bool):
+        return 5
+    elif isinstance(cell_data, float):
+        return _float_length(cell_data)
+    elif isinstance(cell_data, decimal.Decimal):
+        return _decimal_length(cell_data)
+    elif isinstance(cell_data, (Formula, CompiledFormula)) or cell_data is None:
+        return 0
+    return _text_length(str(cell_data))
+
+
+# The length of values of exactly these types, checked before the isinstance checks above. Dates are displayed in the
+# ISO format and datetimes as just their date, see cDateISO.
+_LENGTHS = {
+    str: _text_length,
+    int: lambda cell_data: len(str(cell_data)),
+    float: _float_length,
+    decimal.Decimal: _decimal_length,
+    bool: lambda cell_data: 4 if cell_data else 5,
+    datetime.date: lambda cell_data: 10,
+    datetime.datetime: lambda cell_data: 10,
+    datetime.time: lambda cell_data: 8,
+    Formula: _zero,
+    CompiledFormula: _zero,
+    Cell: _styled_length,
+    type(None): _zero,
+}
+
+
+class ColumnWidths(object):
+    """
+    The running maximum display length of each column of a sheet.
+    """
+    def __init__(self):
+        self.lengths = []
+
+    def add_row(self, cells):
+        """
+        :param cells: A row of cells, as written to the sheet.
+        """
+        lengths = self.lengths
+        get = _LENGTHS.get
+        for i, cell_data in enumerate(cells):
+            length = (get(type(cell_data)) or display_length)(cell_data)
+            if i == len(lengths):
+                lengths.append(length)
+            elif length > lengths[i]:
+                lengths[i] = length
+
+    def add_column(self, index, values):
+        """
+        :param index: Index of the column.
+        :param values: Cells of the column, as Python values.
+        """
+        length = max([display_length(cell_data) for cell_data in values] or [0])
+        self.lengths.extend([0] * (index + 1 - len(self.lengths)))
+        self.lengths[index] = max(self.lengths[index], length)
+
+
+def column_width(length):
+    """
+    :param length: The display length of the longest value in a column.
+    :return: The width of the column, e.g. "3.450cm".
+    """
+    return "%.3fcm" % max(MIN_WIDTH, min(length, MAX_LENGTH) * CHAR_WIDTH + PADDING)
+
+
+class ColumnStyles(object):
+    """
+    The column styles of a spreadsheet, one for each distinct width, named co1, co2 and so on in the order they are
+    first used.
+    """
+    def __init__(self):
+        self.names = {}
+
+    def runs(self, widths, cols=None):
+        """
+        :param widths: ColumnWidths of a sheet.
+        :param cols: The number of columns the sheet was padded to, if any. Columns past the last value have the
+                     minimum width.
+        :return: A list of (style name, number of columns) tuples, for runs of columns of the same width.
+        """
+        lengths = widths.lengths
+        if cols is not None:
+            lengths = lengths + [0] * (cols - len(lengths))
+        runs = []
+        for length in lengths:
+            width = column_width(length)
+            name = self.names.get(width)
+            if name is None:
+                name = self.names[width] = "co{}".format(len(self.names) + 1)
+            if runs and runs[-1][0] == name:
+                runs[-1][1] += 1
+            else:
+                runs.append([name, 1])
+        return [(name, repeats) for name, repeats in runs]
+
+    def definitions(self):
+        """
+        :return: XML text of the style elements, for the office:automatic-styles element of content.xml.
+        """
+        return "".join('\n        <style:style style:name="{}" style:family="table-column">'
+                       '<style:table-column-properties style:column-width="{}"/></style:style>'.format(name, width)
+                       for width, name in self.names.items())
+
+    def add_to(self, prefix):
+        """
+        :param prefix: The start of content.xml, up to the tables.
+        :return: prefix with the column styles added to its automatic styles.
+        """
+        if not self.names:
+            return prefix
+        split = prefix.index("\n    </office:automatic-styles>")
+        return prefix[:split] + self.definitions() + prefix[split:]
+
+
+def columns_xml(runs):
+    """
+    :param runs: Runs of columns, see ColumnStyles.runs.
+    :return: The table:table-column elements of a table, in the same form as the DOM writer produces them.
+    """
+    parts = []
+    for name, repeats in runs:
+        if repeats == 1:
+            parts.append('<table:table-column table:style-name="{}"/>'.format(name))
+        else:
+            parts.append('<table:table-column table:style-name="{}" table:number-columns-repeated="{}"/>'.format(
+                name, repeats))
+    return "".join(parts)
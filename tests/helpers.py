@@ -0,0 +1,10 @@
+import zipfile
+
+
+def content_xml(f):
+    """
+    :param f: Binary file holding an .ods spreadsheet.
+    :return: The content.xml of the spreadsheet, as bytes.
+    """
+    with zipfile.ZipFile(f) as zipf:
+        return zipf.read("content.xml")
@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+import asyncio
+import io
+import zipfile
+import datetime
+
+import odswriter as ods
+
+
+class Sink(object):
+    def __init__(self):
+        self.chunks = []
+
+    async def write(self, data):
+        self.chunks.append(data)
+
+
+async def async_rows(n):
+    for i in range(n):
+        await asyncio.sleep(0)
+        yield [i, "Row {}".format(i), datetime.date(2000, 1, 1)]
+
+
+class TestAsyncODSWriter(TestCase):
+    def expected(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            odsfile.writerows([i, "Row {}".format(i), datetime.date(2000, 1, 1)] for i in range(2500))
+            odsfile.new_sheet("Second").writerow(["Last"])
+        with zipfile.ZipFile(f) as zipf:
+            return zipf.read("content.xml")
+
+    def test_async_iterable(self):
+        sink = Sink()
+
+        async def write():
+            async with ods.AsyncODSWriter(sink, compression=zipfile.ZIP_DEFLATED) as odsfile:
+                await odsfile.writerows(async_rows(2500))
+                second = await odsfile.new_sheet("Second")
+                await second.writerow(["Last"])
+
+        asyncio.run(write())
+        self.assertGreater(len(sink.chunks), 1)
+        with zipfile.ZipFile(io.BytesIO(b"".join(sink.chunks))) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(zipf.namelist()[0], "mimetype")
+            self.assertEqual(zipf.read("content.xml"), self.expected())
+
+    def test_function_sink(self):
+        chunks = []
+
+        async def sink(data):
+            chunks.append(data)
+
+        async def write():
+            odsfile = ods.AsyncODSWriter(sink)
+            for i in range(2500):
+                await odsfile.writerow([i, "Row {}".format(i), datetime.date(2000, 1, 1)])
+            await (await odsfile.new_sheet("Second")).writerows([["Last"]])
+            await odsfile.close()
+
+        asyncio.run(write())
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zipf:
+            self.assertEqual(zipf.read("content.xml"), self.expected())
+
+    def test_close_streams(self):
+        # Everything close writes, here a whole spilled sheet, reaches the sink in chunks rather than in one piece.
+        sink = Sink()
+
+        async def write():
+            async with ods.AsyncODSWriter(sink) as odsfile:
+                first = await odsfile.new_sheet("First")
+                second = await odsfile.new_sheet("Second")
+                for i in range(20000):
+                    await first.writerow([i, "Row {}".format(i)])
+                    await second.writerow([i, "Row {}".format(i)])
+
+        asyncio.run(write())
+        self.assertLess(max(len(chunk) for chunk in sink.chunks), 256 * 1024)
+        with zipfile.ZipFile(io.BytesIO(b"".join(sink.chunks))) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertGreater(zipf.getinfo("content.xml").file_size, 2 * 1024 * 1024)
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import datetime
+import io
+import zipfile
+
+import odswriter as ods
+
+
+def write(sheets, **kwargs):
+    f = io.BytesIO()
+    with ods.writer(f, compression=zipfile.ZIP_DEFLATED, **kwargs) as odsfile:
+        for name, rows in sheets:
+            odsfile.new_sheet(name).writerows(rows)
+    f.seek(0)
+    return f
+
+
+def append(source, sheets, default_rows=(), **kwargs):
+    f = io.BytesIO()
+    with ods.appender(source, f, **kwargs) as odsfile:
+        odsfile.writerows(default_rows)
+        for name, rows in sheets:
+            odsfile.get_sheet(name).writerows(rows)
+    f.seek(0)
+    return f
+
+
+class TestAppend(TestCase):
+    old = [[1, "One & only"], [datetime.date(2020, 1, 1), None, True]]
+    new = [[2, "Two <2>"], ["Three", 3.5]]
+
+    def check_same(self, appended, expected):
+        with zipfile.ZipFile(appended) as a, zipfile.ZipFile(expected) as b:
+            self.assertIsNone(a.testzip())
+            self.assertEqual(a.namelist(), b.namelist())
+            for name in a.namelist():
+                self.assertEqual(a.read(name), b.read(name), name)
+
+    def test_append(self):
+        source = write([("Orders", self.old), ("Empty", []), ("Last", self.old)])
+        for chunk_size in (7, 4096):
+            source.seek(0)
+            appended = append(source, [("Orders", self.new), ("Empty", self.new)], chunk_size=chunk_size)
+            expected = write([("Orders", self.old + self.new), ("Empty", self.new), ("Last", self.old)])
+            self.check_same(appended, expected)
+
+    def test_default_sheet(self):
+        source = write([("Orders", self.old), ("Last", [])])
+        appended = append(source, [("Orders", [["Named"]])], default_rows=self.new)
+        expected = write([("Orders", self.old + self.new + [["Named"]]), ("Last", [])])
+        self.check_same(appended, expected)
+
+    def test_members_not_recompressed(self):
+        source = write([("Orders", self.old)])
+        appended = append(source, [("Orders", self.new)])
+        with zipfile.ZipFile(source) as a, zipfile.ZipFile(appended) as b:
+            for before, after in zip(a.infolist(), b.infolist()):
+                self.assertEqual(before.filename, after.filename)
+                if before.filename != "content.xml":
+                    self.assertEqual((before.CRC, before.compress_size, before.compress_type),
+                                     (after.CRC, after.compress_size, after.compress_type))
+            self.assertEqual(b.namelist()[0], "mimetype")
+
+    def test_named_expressions(self):
+        content = ('<office:document-content><office:body><office:spreadsheet>'
+                   '<table:table table:name="A &amp; B"><table:table-row/>'
+                   '<table:named-expressions><table:named-range table:name="x"/></table:named-expressions>'
+                   '</table:table><table:named-expressions/></office:spreadsheet></office:body>'
+                   '</office:document-content>')
+        source = io.BytesIO()
+        with zipfile.ZipFile(source, "w") as zipf:
+            zipf.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+            zipf.writestr("content.xml", content)
+        appended = append(source, [("A & B", [["New"]])])
+        with zipfile.ZipFile(appended) as zipf:
+            self.assertEqual(zipf.read("content.xml").decode("utf-8"), content.replace(
+                "<table:table-row/>", '<table:table-row/><table:table-row><table:table-cell office:value-type="string">'
+                                      '<text:p>New</text:p></table:table-cell></table:table-row>'))
+
+    def test_missing_sheet(self):
+        source = write([("Orders", self.old)])
+        f = io.BytesIO()
+        with self.assertRaises(KeyError):
+            with ods.appender(source, f) as odsfile:
+                sheets = [odsfile.get_sheet("Orders"), odsfile.get_sheet("Refunds")]
+                for sheet in sheets:
+                    sheet.writerows(self.new)
+        self.assertEqual([sheet.buffer.file.closed for sheet in sheets], [True, True])
+        # The output is left without a central directory, so it can't be mistaken for a complete spreadsheet.
+        self.assertGreater(len(f.getvalue()), 0)
+        self.assertRaises(zipfile.BadZipFile, zipfile.ZipFile, f)
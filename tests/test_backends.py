@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+
+import io
+import os
+import decimal
+import datetime
+
+import odswriter as ods
+from odswriter import backends, reader
+
+from .helpers import content_xml
+
+lxml = backends.available("lxml")
+
+
+def write(sheets, **kwargs):
+    f = io.BytesIO()
+    with ods.writer(f, **kwargs) as odsfile:
+        bold = odsfile.add_style(bold=True)
+        for name, cols, rows in sheets:
+            odsfile.new_sheet(name, cols=cols).writerows(rows)
+            if rows:
+                odsfile.sheets[-1].writerow([ods.Cell(1.5, bold), ods.Cell(datetime.date(2020, 1, 1), bold)])
+    return f
+
+
+ROWS = [
+    ["String", "ABCDEF123456", "<&>'", ""],
+    ["Float", 1, 123.123, decimal.Decimal("10.321"), float("nan"), float("inf")],
+    ["Date/DateTime", datetime.datetime(2020, 1, 1, 12, 30), datetime.date(1989, 11, 9)],
+    ["Time", datetime.time(13, 37), datetime.time(16, 17, 18, 250000)],
+    ["Bool", True, False],
+    ["Formula", ods.Formula("IF(A1=2,B1,C1)")],
+    ["None", None, None],
+    [],
+]
+
+SHEETS = [("First", None, ROWS), (None, 8, ROWS), ("Empty", None, []), ("Empty with cols", 3, [])]
+
+
+class TestBackends(unittest.TestCase):
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, ods.writer, io.BytesIO(), backend="expat")
+        self.assertRaises(ValueError, ods.writer, io.BytesIO(), streaming=True, backend="minidom")
+
+    def test_default_backend(self):
+        with mock.patch.dict(os.environ, {"ODSWRITER_BACKEND": "expat"}):
+            self.assertEqual(backends._default_backend(), "minidom")
+        with mock.patch.dict(os.environ, {"ODSWRITER_BACKEND": "lxml"}):
+            self.assertEqual(backends._default_backend(), "lxml" if lxml else "minidom")
+
+    def test_minidom(self):
+        self.assertEqual(content_xml(write(SHEETS, backend="minidom")), content_xml(write(SHEETS, streaming=True)))
+
+    def test_minidom_dom(self):
+        # ODSWriter.dom is the whole of content.xml, and changes made to it are written out.
+        def write_with_dom(change, **kwargs):
+            f = io.BytesIO()
+            with ods.writer(f, backend="minidom", **kwargs) as odsfile:
+                odsfile.new_sheet("First").writerows(ROWS)
+                dom = odsfile.dom
+                self.assertIs(odsfile.dom, dom)
+                self.assertEqual(len(dom.getElementsByTagName("office:automatic-styles")), 1)
+                odsfile.new_sheet("Second").writerows(ROWS)
+                self.assertEqual(len(dom.getElementsByTagName("table:table")), 2)
+                if change:
+                    dom.getElementsByTagName("table:table")[1].setAttribute("table:name", "Renamed")
+            return f
+
+        f = io.BytesIO()
+        with ods.writer(f, backend="minidom") as odsfile:
+            odsfile.new_sheet("First").writerows(ROWS)
+            odsfile.new_sheet("Second").writerows(ROWS)
+        self.assertEqual(content_xml(write_with_dom(False)), content_xml(f))
+        self.assertEqual([name for name, _ in reader.iter_sheets(write_with_dom(True))], ["First", "Renamed"])
+        self.assertEqual([name for name, _ in reader.iter_sheets(write_with_dom(True, auto_width=True))],
+                         ["First", "Renamed"])
+        with ods.writer(io.BytesIO(), streaming=True) as odsfile:
+            self.assertIsNone(odsfile.dom)
+
+    @unittest.skipUnless(lxml, "lxml is not installed.")
+    def test_lxml_identical(self):
+        self.assertEqual(content_xml(write(SHEETS, backend="lxml")), content_xml(write(SHEETS, backend="minidom")))
+        self.assertEqual(content_xml(write([], backend="lxml")), content_xml(write([], backend="minidom")))
+
+    @unittest.skipUnless(lxml, "lxml is not installed.")
+    def test_lxml_quotes(self):
+        # Before Python 3.13 minidom escapes quotes in text and lxml doesn't, so the XML differs but reads back the same.
+        sheets = [("Quotes", None, [['"Quoted"', "It's"]])]
+        self.assertEqual(list(reader.iter_rows(write(sheets, backend="lxml"))),
+                         list(reader.iter_rows(write(sheets, backend="minidom"))))
+
+    @unittest.skipUnless(lxml, "lxml is not installed.")
+    def test_lxml_carriage_return(self):
+        # lxml escapes carriage returns in text and minidom doesn't, so only lxml's survive being read back.
+        sheets = [("Returns", None, [["a\rb"]])]
+        self.assertEqual(list(reader.iter_rows(write(sheets, backend="lxml")))[0][0], "a\rb")
+        self.assertEqual(list(reader.iter_rows(write(sheets, backend="minidom")))[0][0], "a\nb")
+
+    @unittest.skipUnless(lxml, "lxml is not installed.")
+    def test_lxml_too_many_cells(self):
+        f = io.BytesIO()
+        with ods.writer(f, backend="lxml") as odsfile:
+            sheet = odsfile.new_sheet("Short", cols=2)
+            self.assertRaises(Exception, sheet.writerow, [1, 2, 3])
+            sheet.writerow([1, 2])
+        self.assertEqual(list(reader.iter_rows(f)), [[1, 2]])
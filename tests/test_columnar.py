@@ -0,0 +1,97 @@
+import unittest
+
+import io
+import datetime
+
+import odswriter as ods
+
+from .helpers import content_xml
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+class TestColumns(unittest.TestCase):
+    def write(self, write, **kwargs):
+        f = io.BytesIO()
+        with ods.writer(f, **kwargs) as odsfile:
+            write(odsfile.new_sheet("Data", cols=5))
+        return content_xml(f)
+
+    def test_sequences(self):
+        columns = {"Name": ["A", "B&C", None], "Value": [1, 2.5, True]}
+        rows = [["Name", "Value"], ["A", 1], ["B&C", 2.5], [None, True]]
+        expected = self.write(lambda sheet: sheet.writerows(rows))
+        self.assertEqual(expected, self.write(lambda sheet: sheet.write_columns(columns, header=True)))
+        self.assertEqual(expected, self.write(lambda sheet: sheet.write_columns(columns, header=True),
+                                              streaming=True))
+
+    def test_lengths(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            self.assertRaises(ValueError, odsfile.new_sheet().write_columns, [[1, 2], [3]])
+
+    @unittest.skipUnless(numpy, "NumPy not installed")
+    def test_numpy(self):
+        columns = [numpy.arange(12000, dtype="int64"),
+                   numpy.linspace(0, 1, 12000),
+                   numpy.arange(12000) % 3 == 0,
+                   numpy.arange(12000).astype("datetime64[D]"),
+                   numpy.arange(12000).astype("datetime64[s]")]
+        columns[1][7] = numpy.nan
+        columns[4][9] = numpy.datetime64("NaT")
+        rows = list(zip(*[column.tolist() for column in columns]))
+        rows = [[int(row[0]), None if row[1] != row[1] else row[1], row[2],
+                 datetime.date(1970, 1, 1) + datetime.timedelta(days=row[3].toordinal() - 719163), row[4]]
+                for row in rows]
+        expected = self.write(lambda sheet: sheet.writerows(rows), streaming=True)
+        self.assertEqual(expected, self.write(lambda sheet: sheet.write_columns(columns), streaming=True))
+        self.assertEqual(expected, self.write(lambda sheet: sheet.write_columns(columns), streaming=True,
+                                              workers=1))
+        self.assertEqual(self.write(lambda sheet: sheet.writerows(rows[:500])),
+                         self.write(lambda sheet: sheet.write_columns([column[:500] for column in columns])))
+
+    @unittest.skipUnless(numpy, "NumPy not installed")
+    def test_2d_array(self):
+        array = numpy.arange(12).reshape(4, 3)
+        self.assertEqual(self.write(lambda sheet: sheet.writerows(array.tolist()), streaming=True),
+                         self.write(lambda sheet: sheet.write_columns(array), streaming=True))
+
+    @unittest.skipUnless(pandas, "pandas not installed")
+    def test_frame(self):
+        frame = pandas.DataFrame({"Name": ["A", "B", None],
+                                  "Count": pandas.array([1, None, 3], dtype="Int64"),
+                                  "Price": [1.5, float("nan"), 2.0],
+                                  "When": pandas.to_datetime(["2020-01-02 03:04:05", None, "2021-06-07 00:00:00"])})
+        rows = [["Name", "Count", "Price", "When"],
+                ["A", 1, 1.5, datetime.datetime(2020, 1, 2, 3, 4, 5)],
+                ["B", None, None, None],
+                [None, 3, 2.0, datetime.datetime(2021, 6, 7)]]
+        for kwargs in ({}, {"streaming": True}):
+            expected, actual = io.BytesIO(), io.BytesIO()
+            with ods.writer(expected, **kwargs) as odsfile:
+                odsfile.writerows(rows)
+            with ods.writer(actual, **kwargs) as odsfile:
+                odsfile.write_frame(frame)
+            self.assertEqual(content_xml(expected), content_xml(actual))
+
+    @unittest.skipUnless(pandas, "pandas not installed")
+    def test_tz_aware_frame(self):
+        # A tz-aware column has kind "M" but comes out of to_numpy as Timestamps, with NaT for missing values.
+        when = pandas.Series(pandas.to_datetime(["2020-01-02 03:04:05", None]).tz_localize("UTC"))
+        rows = [["When"], [when[0].to_pydatetime()], [None]]
+        for kwargs in ({}, {"streaming": True}):
+            expected, actual = io.BytesIO(), io.BytesIO()
+            with ods.writer(expected, **kwargs) as odsfile:
+                odsfile.writerows(rows)
+            with ods.writer(actual, **kwargs) as odsfile:
+                odsfile.write_frame({"When": when})
+            self.assertEqual(content_xml(expected), content_xml(actual))
+            self.assertNotIn(b"NaT", content_xml(actual))
@@ -0,0 +1,83 @@
+from unittest import TestCase, mock
+
+import io
+import random
+import zipfile
+import zlib
+
+import odswriter as ods
+from odswriter.compression import ParallelCompressor
+
+
+class TestParallelCompressor(TestCase):
+    def compress(self, chunks, **kwargs):
+        compressor = ParallelCompressor(3, **kwargs)
+        return b"".join([compressor.compress(chunk) for chunk in chunks]) + compressor.flush()
+
+    def test_round_trip(self):
+        rng = random.Random(1)
+        words = [b"cell", b"row", b"table", b"12345", b"<text:p>", b"\xff\x00"]
+        data = b" ".join(rng.choice(words) for _ in range(200000))
+        chunks = [data[i:i + rng.randint(1, 50000)] for i in range(0, len(data), 25000)]
+        data = b"".join(chunks)
+        compressed = self.compress(chunks, block_size=64 * 1024)
+        self.assertEqual(zlib.decompress(compressed, -15), data)
+        # Priming each block with the previous one keeps the ratio close to a single stream.
+        self.assertLess(len(compressed), len(zlib.compress(data)) * 1.1)
+
+    def test_empty(self):
+        self.assertEqual(zlib.decompress(self.compress([]), -15), b"")
+        self.assertEqual(zlib.decompress(self.compress([b""]), -15), b"")
+
+
+class TestCompressThreads(TestCase):
+    def write(self, **kwargs):
+        f = io.BytesIO()
+        with ods.writer(f, compression=zipfile.ZIP_DEFLATED, **kwargs) as odsfile:
+            for i in range(5000):
+                odsfile.writerow([i, "Row {}".format(i), i * 0.5])
+        with zipfile.ZipFile(f) as zipf:
+            self.assertIsNone(zipf.testzip())
+            return zipf.read("content.xml")
+
+    def test_dom(self):
+        self.assertEqual(self.write(), self.write(compress_threads=4))
+
+    def test_streaming(self):
+        self.assertEqual(self.write(streaming=True), self.write(streaming=True, compress_threads=4))
+
+
+class TestZip64(TestCase):
+    # Lowering ZIP64_LIMIT stands in for a content.xml of over 2GiB.
+    def write(self, **kwargs):
+        f = io.BytesIO()
+        with mock.patch.object(zipfile, "ZIP64_LIMIT", 1024):
+            with ods.writer(f, **kwargs) as odsfile:
+                for i in range(1000):
+                    odsfile.writerow([i, "Row {}".format(i)])
+            with zipfile.ZipFile(f) as zipf:
+                self.assertIsNone(zipf.testzip())
+                self.assertGreater(zipf.getinfo("content.xml").file_size, 1024)
+                return zipf.read("content.xml")
+
+    def test_dom(self):
+        self.write()
+
+    def test_streaming(self):
+        self.assertEqual(self.write(streaming=True), self.write())
+
+    def test_compress_threads(self):
+        self.write(compression=zipfile.ZIP_DEFLATED, compress_threads=2)
+        self.write(compression=zipfile.ZIP_DEFLATED, compress_threads=2, streaming=True)
+
+    def test_append(self):
+        f = io.BytesIO()
+        with ods.writer(f) as odsfile:
+            odsfile.writerow(["Header"])
+        output = io.BytesIO()
+        with mock.patch.object(zipfile, "ZIP64_LIMIT", 1024):
+            with ods.appender(f, output) as odsfile:
+                for i in range(1000):
+                    odsfile.writerow([i])
+            with zipfile.ZipFile(output) as zipf:
+                self.assertIsNone(zipf.testzip())
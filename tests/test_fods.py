@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+import io
+import os
+import tempfile
+import zipfile
+from xml.dom.minidom import parseString
+
+import odswriter as ods
+
+
+def write_rows(odsfile):
+    bold = odsfile.add_style(bold=True)
+    odsfile.writerow(["Name", ods.Cell("Total", bold)])
+    # The second sheet is buffered until the first is finished, in chunks which split multibyte characters.
+    other = odsfile.new_sheet("Other €")
+    first = odsfile.default_sheet
+    for i in range(2000):
+        other.writerow(["é€", i])
+        first.writerow([i, "x"])
+
+
+class TestFlat(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            write_rows(odsfile)
+        with zipfile.ZipFile(f) as zipf:
+            cls.body = parseString(zipf.read("content.xml")).getElementsByTagName("office:body")[0].toxml()
+
+    def check(self, xml):
+        dom = parseString(xml)
+        root = dom.documentElement
+        self.assertEqual(root.tagName, "office:document")
+        self.assertEqual(root.getAttribute("office:mimetype"), "application/vnd.oasis.opendocument.spreadsheet")
+        self.assertEqual([node.tagName for node in root.childNodes if node.nodeType == node.ELEMENT_NODE],
+                         ["office:styles", "office:automatic-styles", "office:body"])
+        names = [style.getAttribute("style:name") for style in dom.getElementsByTagName("style:style")]
+        self.assertIn("ce1", names)
+        self.assertEqual(dom.getElementsByTagName("office:body")[0].toxml(), self.body)
+
+    def test_binary(self):
+        f = io.BytesIO()
+        with ods.writer(f, format="fods") as odsfile:
+            write_rows(odsfile)
+        self.check(f.getvalue())
+
+    def test_text(self):
+        f = io.StringIO()
+        with ods.writer(f, format="fods") as odsfile:
+            write_rows(odsfile)
+        self.check(f.getvalue().encode("utf-8"))
+
+    def test_path(self):
+        fd, path = tempfile.mkstemp(suffix=".fods")
+        os.close(fd)
+        try:
+            with ods.writer(path, format="fods") as odsfile:
+                write_rows(odsfile)
+            with open(path, "rb") as f:
+                self.check(f.read())
+        finally:
+            os.remove(path)
+
+    def test_empty(self):
+        f = io.BytesIO()
+        with ods.writer(f, format="fods"):
+            pass
+        parseString(f.getvalue())
+
+    def test_styles_first(self):
+        with ods.writer(io.BytesIO(), format="fods") as odsfile:
+            odsfile.writerow([1])
+            with self.assertRaises(ValueError):
+                odsfile.add_style(bold=True)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            ods.writer(io.BytesIO(), format="xlsx")
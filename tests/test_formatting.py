@@ -0,0 +1,74 @@
+import unittest
+
+import io
+import zipfile
+import decimal
+import datetime
+
+import odswriter as ods
+from odswriter import formatting
+
+from . import helpers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def content_xml(rows, **kwargs):
+    f = io.BytesIO()
+    with ods.writer(f, **kwargs) as odsfile:
+        odsfile.writerows(rows)
+    return helpers.content_xml(f).decode("utf-8")
+
+
+class TestFormatting(unittest.TestCase):
+    def test_numbers(self):
+        self.assertEqual(formatting.format_number(0.1), "0.1")
+        self.assertEqual(formatting.format_number(1e300), "1e+300")
+        self.assertEqual(formatting.format_number(float("inf")), "INF")
+        self.assertEqual(formatting.format_number(float("-inf")), "-INF")
+        self.assertIsNone(formatting.format_number(float("nan")))
+        self.assertEqual(formatting.format_number(decimal.Decimal("1.50")), "1.50")
+        self.assertEqual(formatting.format_number(decimal.Decimal("-Infinity")), "-INF")
+        self.assertIsNone(formatting.format_number(decimal.Decimal("NaN")))
+        self.assertEqual(formatting.format_number(12345678901234567890), "12345678901234567890")
+
+    def test_times(self):
+        self.assertEqual(formatting.format_duration(datetime.time(13, 37)), "PT13H37M00S")
+        self.assertEqual(formatting.format_duration(datetime.time(1, 2, 3, 250000)), "PT01H02M03.25S")
+        self.assertEqual(formatting.format_duration(datetime.time(1, 2, 3, 1)), "PT01H02M03.000001S")
+        self.assertEqual(formatting.format_time(datetime.time(1, 2, 3, 250000)), "01:02:03")
+
+    def test_dom_and_streaming_match(self):
+        class MyFloat(float):
+            def __repr__(self):
+                return "MyFloat()"
+
+        rows = [
+            [1.5, float("nan"), float("inf"), -float("inf"), MyFloat(2.5)],
+            [decimal.Decimal("NaN"), decimal.Decimal("Infinity"), decimal.Decimal("1E+3")],
+            [datetime.time(1, 2, 3, 456000), datetime.date(2020, 1, 1), datetime.date(2020, 1, 1)],
+        ]
+        content = content_xml(rows)
+        self.assertEqual(content_xml(rows, streaming=True), content)
+        self.assertIn('office:value="2.5"', content)
+        self.assertIn('office:value="INF"', content)
+        self.assertIn('office:value="-INF"', content)
+        self.assertNotIn("nan", content.lower())
+        self.assertIn('office:time-value="PT01H02M03.456S"', content)
+
+    @unittest.skipUnless(numpy, "NumPy is not installed.")
+    def test_columns(self):
+        column = numpy.array([1.5, numpy.nan, numpy.inf, -numpy.inf])
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            odsfile.new_sheet("Columns").write_columns([column])
+            odsfile.new_sheet("Rows").writerows([[value] for value in column.tolist()])
+        with zipfile.ZipFile(f) as zipf:
+            content = zipf.read("content.xml").decode("utf-8")
+        columns, rows = [sheet[sheet.index("<table:table-row>"):sheet.index("</table:table>")]
+                         for sheet in content.split('table:name="Rows"')]
+        self.assertEqual(columns, rows)
+        self.assertIn('office:value="-INF"', columns)
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+import odswriter as ods
+
+
+class TestFormula(TestCase):
+    def test_compile(self):
+        self.assertEqual(str(ods.Formula("=IF(C1=2;MIN(B1:D1);MAX(B1:D1))")),
+                         "of:=IF([.C1]=2;MIN([.B1:.D1]);MAX([.B1:.D1]))")
+        self.assertEqual(str(ods.Formula("SUM(B1:D1)")), "of:=SUM([.B1:.D1])")
+
+    def test_cache(self):
+        ods.set_formula_cache_size(2)
+        try:
+            for s in ("A1+1", "A1+1", "A2+1", "A3+1", "A1+1"):
+                str(ods.Formula(s))
+            info = ods.formula_cache_info()
+            self.assertEqual((info.hits, info.misses, info.currsize), (1, 4, 2))
+        finally:
+            ods.set_formula_cache_size(ods.formula.CACHE_SIZE)
+
+
+class TestFormulaTemplate(TestCase):
+    def test_shifted(self):
+        template = ods.FormulaTemplate("=IF(B2=2;SUM(A1:Z10);C2)")
+        self.assertEqual(str(template.shifted()), str(ods.Formula("=IF(B2=2;SUM(A1:Z10);C2)")))
+        self.assertEqual(str(template.shifted(rows=3, cols=1)), str(ods.Formula("=IF(C5=2;SUM(B4:AA13);D5)")))
+        for rows in range(0, 1000, 37):
+            self.assertEqual(str(template.shifted(rows=rows)),
+                             str(ods.Formula("=IF(B{0}=2;SUM(A{1}:Z{2});C{0})".format(2 + rows, 1 + rows,
+                                                                                         10 + rows))))
+
+    def test_off_sheet(self):
+        template = ods.FormulaTemplate("=B2*C2")
+        self.assertRaises(ValueError, template.shifted, rows=-2)
+        self.assertRaises(ValueError, template.shifted, cols=-2)
+        self.assertEqual(str(template.shifted(rows=-1, cols=-1)), "of:=[.A1]*[.B1]")
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+import io
+import os
+import subprocess
+import sys
+import zipfile
+
+import odswriter as ods
+from odswriter import streaming
+
+
+class TestImports(TestCase):
+    def test_lazy_imports(self):
+        # Run in a fresh interpreter, as other tests have imported everything already.
+        code = ("import sys, odswriter; "
+                "print(' '.join(m for m in ('xml.dom.minidom', 'asyncio', 'concurrent.futures', 'urllib.request') "
+                "if m in sys.modules))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=root)
+        self.assertEqual(output.strip(), b"")
+        self.assertEqual(ods.AsyncODSWriter.__module__, "odswriter.aio")
+
+    def test_content_chunks_cached(self):
+        self.assertIs(streaming.content_chunks(), streaming.content_chunks())
+
+    def test_dom_skeleton(self):
+        # The DOM only holds the tables, the rest of content.xml comes from the same skeleton as streaming uses.
+        f = io.BytesIO()
+        with ods.writer(f) as odsfile:
+            odsfile.new_sheet("Sheet").writerow([1])
+        with zipfile.ZipFile(f) as zipf:
+            content = zipf.read("content.xml").decode("utf-8")
+        prefix, suffix = streaming.content_chunks()
+        self.assertTrue(content.startswith(prefix))
+        self.assertTrue(content.endswith(suffix))
+        self.assertIn('<table:table table:name="Sheet"', content)
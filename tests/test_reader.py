@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+import io
+import zipfile
+import decimal
+import datetime
+
+import odswriter as ods
+from odswriter import reader
+
+
+ROWS = [
+    ["String", "<&>\"'", "", "Two\nlines", "  spaced  "],
+    [1, -2, 12345678901234567890, 1.5, decimal.Decimal("10.25"), float("inf")],
+    [datetime.date(1989, 11, 9), datetime.datetime(2020, 1, 1, 12, 30, 15, 250000), datetime.time(13, 37, 5, 500)],
+    [True, False, None, None, "After gap"],
+    [],
+    [],
+    ["After empty rows", None, None],
+    [ods.Formula("SUM(B2:C2)")],
+]
+
+EXPECTED = [
+    ["String", "<&>\"'", "", "Two\nlines", "  spaced  "],
+    [1, -2, 12345678901234567890, 1.5, 10.25, float("inf")],
+    [datetime.date(1989, 11, 9), datetime.datetime(2020, 1, 1, 12, 30, 15, 250000), datetime.time(13, 37, 5, 500)],
+    [True, False, None, None, "After gap"],
+    [],
+    [],
+    ["After empty rows"],
+]
+
+
+def write(sheets, **kwargs):
+    f = io.BytesIO()
+    with ods.writer(f, **kwargs) as odsfile:
+        for name, rows, cols in sheets:
+            odsfile.new_sheet(name, cols=cols).writerows(rows)
+    f.seek(0)
+    return f
+
+
+class TestReader(TestCase):
+    def check(self, **kwargs):
+        f = write([("First", ROWS, None), ("Padded", ROWS + [[], []], 8), ("Empty", [], None)], **kwargs)
+        sheets = [(name, list(rows)) for name, rows in reader.iter_sheets(f)]
+        self.assertEqual(sheets, [("First", EXPECTED), ("Padded", EXPECTED), ("Empty", [])])
+        f.seek(0)
+        self.assertEqual(list(reader.iter_rows(f, "Padded", formulas=True))[-1], ["of:=SUM([.B2:.C2])"])
+
+    def test_dom(self):
+        self.check()
+
+    def test_streaming(self):
+        self.check(streaming=True, compression=zipfile.ZIP_DEFLATED)
+
+    def test_collapsed(self):
+        self.check(streaming=True, collapse_repeated=True)
+
+    def test_flat(self):
+        self.check(format="fods")
+
+    def test_repeats(self):
+        f = write([(None, [["x"] * 3, ["x"] * 3, ["x"] * 3, [None] * 5, ["y", None, None, None, "y"]], 5)],
+                  streaming=True, collapse_repeated=True)
+        content = zipfile.ZipFile(f).read("content.xml")
+        self.assertIn(b'table:number-rows-repeated="3"', content)
+        self.assertEqual(list(reader.iter_rows(f)), [["x"] * 3] * 3 + [[], ["y", None, None, None, "y"]])
+
+    def test_skipped_sheets(self):
+        f = write([("A", [[1]] * 10, None), ("B", [[2]], None)])
+        names = [name for name, _ in reader.iter_sheets(f)]
+        self.assertEqual(names, ["A", "B"])
+        f.seek(0)
+        self.assertEqual(list(reader.iter_rows(f, "B")), [[2]])
+        with self.assertRaises(KeyError):
+            list(reader.iter_rows(f, "C"))
+
+    def test_text_elements(self):
+        content = ('<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+                   'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+                   'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"><office:body><office:spreadsheet>'
+                   '<table:table table:name="S"><table:table-row><table:table-cell office:value-type="string">'
+                   '<office:annotation><text:p>Comment</text:p></office:annotation>'
+                   '<text:p>a<text:s text:c="3"/>b<text:tab/>c<text:span>d</text:span></text:p></table:table-cell>'
+                   '<table:table-cell office:value-type="time" office:time-value="PT36H00M00S"/>'
+                   '</table:table-row></table:table></office:spreadsheet></office:body></office:document-content>')
+        f = io.BytesIO()
+        with zipfile.ZipFile(f, "w") as zipf:
+            zipf.writestr("content.xml", content)
+        self.assertEqual(list(reader.iter_rows(f)), [["a   b\tcd", datetime.timedelta(hours=36)]])
+
+    def test_verify(self):
+        f = write([("First", ROWS, None), ("Second", [[1]], None)], compression=zipfile.ZIP_DEFLATED)
+        self.assertEqual(reader.verify(f), [("First", 7), ("Second", 1)])
+        broken = io.BytesIO()
+        with zipfile.ZipFile(broken, "w", zipfile.ZIP_DEFLATED) as zipf:
+            zipf.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+        with self.assertRaises(ValueError):
+            reader.verify(broken)
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+import io
+
+import odswriter as ods
+
+
+class TestSheetIndex(TestCase):
+    def check_index(self, **kwargs):
+        with ods.writer(io.BytesIO(), **kwargs) as odsfile:
+            first = odsfile.new_sheet("First")
+            second = odsfile.new_sheet("Second")
+            odsfile.new_sheet()
+            odsfile.new_sheet()  # Unnamed sheets are not indexed, so can't clash.
+            self.assertIs(odsfile.get_sheet("First"), first)
+            self.assertIs(odsfile.get_sheet("Second"), second)
+            with self.assertRaises(KeyError):
+                odsfile.get_sheet("Third")
+            with self.assertRaises(ValueError):
+                odsfile.new_sheet("First")
+            self.assertEqual(len(odsfile.sheets), 4)
+
+    def test_dom(self):
+        self.check_index()
+
+    def test_streaming(self):
+        self.check_index(streaming=True)
+
+    def test_many_sheets(self):
+        f = io.BytesIO()
+        with ods.writer(f, backend="minidom") as odsfile:
+            for i in range(50):
+                odsfile.new_sheet("Customer {}".format(i)).writerows([[i, "Order"]] * 10)
+        content = odsfile.dom.toxml()
+        self.assertEqual(content.count("<table:table "), 50)
+        self.assertLess(content.index('table:name="Customer 0"'), content.index('table:name="Customer 49"'))
@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+import io
+import sqlite3
+import threading
+
+import odswriter as ods
+from odswriter import reader
+from odswriter.sources import prefetch
+
+from .helpers import content_xml
+
+
+class TestPrefetch(TestCase):
+    def test_order(self):
+        self.assertEqual(list(prefetch(range(2500), size=100, batches=2)), list(range(2500)))
+        self.assertEqual(list(prefetch([])), [])
+
+    def test_error(self):
+        def rows():
+            yield 1
+            raise KeyError("broken")
+        with self.assertRaises(KeyError):
+            list(prefetch(rows()))
+
+    def test_close_early(self):
+        rows = prefetch(iter(range(10 ** 6)), size=10, batches=2)
+        self.assertEqual(next(rows), 0)
+        rows.close()
+        self.assertEqual([t.name for t in threading.enumerate() if t.name == "odswriter-prefetch"], [])
+
+
+class TestLazySheets(TestCase):
+    def write(self, **kwargs):
+        read = []
+
+        def rows(name, count):
+            for i in range(count):
+                read.append(name)
+                yield [name, i]
+
+        f = io.BytesIO()
+        with ods.writer(f, **kwargs) as odsfile:
+            orders = odsfile.new_sheet("Orders", rows=rows("Orders", 3000))
+            odsfile.new_sheet("Refunds", rows=rows("Refunds", 10))
+            orders.writerow(["First"])
+            self.assertEqual(read, [])
+        self.assertEqual(len(read), 3010)
+        return content_xml(f)
+
+    def test_lazy(self):
+        content = self.write()
+        self.assertEqual(self.write(streaming=True), content)
+        self.assertLess(content.index(b"First"), content.index(b"<text:p>Orders</text:p>"))
+        self.assertEqual(content.count(b"<text:p>Refunds</text:p>"), 10)
+
+    def test_streamed_after_head(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            odsfile.writerow(["Head"])
+            sheet = odsfile.new_sheet("Lazy", rows=[[1], [2]])
+        # Once the head sheet is finished, the lazy sheet is written straight into content.xml.
+        self.assertIs(sheet.out, odsfile.content)
+        self.assertIn(b"<text:p>2</text:p>", content_xml(f))
+
+    def test_thread_affine_source(self):
+        # sqlite3 cursors can only be used in the thread that created them.
+        connection = sqlite3.connect(":memory:")
+        self.addCleanup(connection.close)
+        connection.execute("CREATE TABLE orders (id INTEGER, item TEXT)")
+        connection.executemany("INSERT INTO orders VALUES (?, ?)", [(i, "Item {}".format(i)) for i in range(50)])
+        for streaming in (False, True):
+            f = io.BytesIO()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                with ods.writer(f, streaming=streaming) as odsfile:
+                    odsfile.new_sheet("Orders", rows=connection.execute("SELECT * FROM orders"))
+            f = io.BytesIO()
+            with ods.writer(f, streaming=streaming) as odsfile:
+                odsfile.new_sheet("Orders", rows=connection.execute("SELECT * FROM orders"), prefetch=False)
+            self.assertEqual(list(reader.iter_rows(f)), [[i, "Item {}".format(i)] for i in range(50)])
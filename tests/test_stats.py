@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import datetime
+import io
+import json
+import zipfile
+
+import odswriter as ods
+
+
+class TestWriterStats(TestCase):
+    def write(self, **kwargs):
+        stats = ods.WriterStats()
+        f = io.BytesIO()
+        with ods.writer(f, compression=zipfile.ZIP_DEFLATED, stats=stats, **kwargs) as odsfile:
+            for i in range(2000):
+                odsfile.writerow([i, "Row {}".format(i), datetime.date(2020, 1, 1), None])
+            sheet = odsfile.new_sheet("Second")
+            sheet.writerow([True, 1.5])
+        return stats
+
+    def check(self, stats):
+        self.assertEqual(stats.rows, 2001)
+        self.assertEqual(stats.cells, {"int": 2000, "str": 2000, "date": 2000, "NoneType": 2000, "bool": 1,
+                                       "float": 1})
+        self.assertEqual(set(stats.members), {"mimetype", "META-INF/manifest.xml", "styles.xml", "content.xml"})
+        content = stats.members["content.xml"]
+        self.assertLess(content["compressed_bytes"], content["bytes"])
+        for phase in ("encode", "serialize", "compress"):
+            self.assertGreater(stats.phases[phase], 0)
+        json.dumps(stats.as_dict())
+
+    def test_dom(self):
+        self.check(self.write())
+
+    def test_streaming(self):
+        self.check(self.write(streaming=True))
+
+    def test_callback(self):
+        seen = []
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True, stats=ods.WriterStats(seen.append)) as odsfile:
+            odsfile.writerow(["a"])
+            self.assertEqual(seen, [])
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(seen[0].rows, 1)
@@ -0,0 +1,365 @@
+from unittest import TestCase
+
+import io
+import zipfile
+import decimal
+import datetime
+
+import odswriter as ods
+from odswriter import reader, serializer
+
+from .helpers import content_xml
+
+
+def write(rows, sheets=None, **kwargs):
+    f = io.BytesIO()
+    with ods.writer(f, **kwargs) as odsfile:
+        if sheets is None:
+            odsfile.writerows(rows)
+        else:
+            for name, cols, sheet_rows in sheets:
+                odsfile.new_sheet(name, cols=cols).writerows(sheet_rows)
+    return content_xml(f)
+
+
+class TestStreaming(TestCase):
+    def setUp(self):
+        self.rows = [
+            ["String", "ABCDEF123456", "123456", "<&>\"'", ""],
+            ["Float", 1, 123, 123.123, decimal.Decimal("10.321")],
+            ["Date/DateTime", datetime.datetime.now(), datetime.date(1989, 11, 9)],
+            ["Time", datetime.time(13, 37), datetime.time(16, 17, 18)],
+            ["Bool", True, False, True],
+            ["Formula", 1, 2, 3, ods.Formula("IF(A1=2,B1,C1)")],
+            ["None", None, None],
+            [],
+        ]
+
+    def test_single_sheet_identical(self):
+        self.assertEqual(write(self.rows), write(self.rows, streaming=True))
+
+    def test_multi_sheet_identical(self):
+        sheets = [("Bears", None, self.rows),
+                  (None, 6, self.rows),
+                  ("Empty", None, []),
+                  ("Empty with cols", 3, []),
+                  ("Big", None, [[i, "row {}".format(i)] for i in range(5000)])]
+        self.assertEqual(write(None, sheets), write(None, sheets, streaming=True))
+
+    def test_no_sheets(self):
+        self.assertEqual(write([]), write([], streaming=True))
+
+    def test_too_many_cells(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            sheet = odsfile.new_sheet("My Sheet", cols=2)
+            self.assertRaises(Exception, sheet.writerow, [1, 2, 3])
+
+    def test_interleaved_sheets_identical(self):
+        def interleaved(**kwargs):
+            f = io.BytesIO()
+            with ods.writer(f, **kwargs) as odsfile:
+                sheets = [odsfile.new_sheet("Sheet {}".format(i), cols=3 if i % 2 else None) for i in range(4)]
+                for i in range(2000):
+                    sheets[i % 3].writerow([i, "Row {}".format(i)])
+                    sheets[(i * 7) % 4].writerow([str(i)])
+            return content_xml(f)
+        dom = interleaved()
+        self.assertEqual(dom, interleaved(streaming=True))
+        # A tiny threshold makes every buffered sheet spill to disk.
+        self.assertEqual(dom, interleaved(streaming=True, spill_threshold=100))
+
+    def test_closed_sheet(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            sheet = odsfile.new_sheet("First")
+        self.assertRaises(Exception, sheet.writerow, [1])
+
+    def test_whitespace_in_attributes(self):
+        # Tabs and line breaks in attributes are escaped, otherwise readers normalise them to spaces.
+        name = "Line\nbreak\tand\r\ntab"
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            odsfile.new_sheet(name).writerow([ods.Formula('"a\nb"'), "Text\nwith \"quotes\""])
+        self.assertEqual([(sheet_name, list(rows)) for sheet_name, rows in reader.iter_sheets(f, formulas=True)],
+                         [(name, [['of:="a\nb"', "Text\nwith \"quotes\""]])])
+
+    def test_subclasses_identical(self):
+        class MyInt(int):
+            def __str__(self):
+                return "<{}>".format(int(self))
+
+        class MyDate(datetime.date):
+            pass
+
+        class MyFormula(ods.Formula):
+            pass
+
+        class Unknown(object):
+            def __str__(self):
+                return "Unknown & unloved"
+
+        rows = [[MyInt(3), MyDate(2000, 1, 2), MyFormula("A1+1"), Unknown(), decimal.Decimal("1.5")]] * 2
+        self.assertEqual(write(rows), write(rows, streaming=True))
+
+
+class TestSchema(TestCase):
+    def setUp(self):
+        self.schema = [str, decimal.Decimal, datetime.date, int, None]
+        self.rows = [["Apples", decimal.Decimal("1.20"), datetime.date(2020, 1, 2), 3, True],
+                     ["<Pears>", None, datetime.date(2020, 1, 3), 0, "Mixed"],
+                     ["", decimal.Decimal("0.5")],
+                     []]
+
+    def write(self, cols=None, schema=None):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            odsfile.new_sheet("Typed", cols=cols, schema=schema).writerows(self.rows)
+        return content_xml(f)
+
+    def test_identical(self):
+        self.assertEqual(self.write(), self.write(schema=self.schema))
+        self.assertEqual(self.write(cols=7), self.write(cols=7, schema=self.schema))
+
+    def test_mismatched_types(self):
+        # Cells which aren't of the declared type are serialised as they would be without a schema.
+        self.rows = [[4, 3, "2020-01-02", "a<b", None], [None, 1.5, datetime.datetime(2020, 1, 2, 3), True, 1]]
+        self.assertEqual(self.write(), self.write(schema=self.schema))
+
+    def test_cells_beyond_schema(self):
+        # cols leaves room for cells beyond the schema, as it does for rows without one.
+        self.rows = [[1, 2], [1, "Two", None], [None, datetime.date(2020, 1, 2)], []]
+        self.assertEqual(self.write(cols=3), self.write(cols=3, schema=[int]))
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            self.assertRaises(Exception, odsfile.new_sheet("Typed", cols=3, schema=[int]).writerow, [1, 2, 3, 4])
+            self.assertRaises(Exception, odsfile.new_sheet("Untyped", schema=[int]).writerow, [1, 2])
+
+    def test_schema_wider_than_cols(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            self.assertRaises(ValueError, odsfile.new_sheet, "Typed", cols=2, schema=self.schema)
+
+    def test_too_many_cells(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            sheet = odsfile.new_sheet("Typed", schema=[str, int])
+            self.assertRaises(Exception, sheet.writerow, ["One", 2, 3])
+
+    def test_dom_mode(self):
+        f = io.BytesIO()
+        with ods.writer(f) as odsfile:
+            self.assertRaises(ValueError, odsfile.new_sheet, "Typed", schema=self.schema)
+
+
+class TestCollapseRepeated(TestCase):
+    def write(self, rows, cols=None, schema=None):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True, collapse_repeated=True) as odsfile:
+            odsfile.new_sheet("Sparse", cols=cols, schema=schema).writerows(rows)
+        return content_xml(f).decode("utf-8")
+
+    def test_cells(self):
+        xml = self.write([["A", None, None, None, "B", "B", 1, 1, 1]])
+        self.assertIn('<table:table-row><table:table-cell office:value-type="string"><text:p>A</text:p>'
+                      '</table:table-cell><table:table-cell table:number-columns-repeated="3"/>'
+                      '<table:table-cell table:number-columns-repeated="2" office:value-type="string"><text:p>B'
+                      '</text:p></table:table-cell><table:table-cell table:number-columns-repeated="3" '
+                      'office:value-type="float" office:value="1"><text:p>1</text:p></table:table-cell>'
+                      '</table:table-row>', xml)
+
+    def test_padding(self):
+        xml = self.write([["A"]], cols=1000)
+        self.assertIn('<table:table-cell table:number-columns-repeated="999"/></table:table-row>', xml)
+
+    def test_rows(self):
+        xml = self.write([["A"], [], [], [], ["B"], ["B"], ["C"]])
+        self.assertIn('</table:table-row><table:table-row table:number-rows-repeated="3"/>'
+                      '<table:table-row table:number-rows-repeated="2"><table:table-cell', xml)
+        self.assertEqual(xml.count("<table:table-row"), 4)
+
+    def test_blank_rows_with_cols(self):
+        xml = self.write([[None]] * 500, cols=3, schema=[str, int, int])
+        self.assertIn('<table:table-row table:number-rows-repeated="500">'
+                      '<table:table-cell table:number-columns-repeated="3"/></table:table-row></table:table>', xml)
+
+    def test_formulas_not_collapsed(self):
+        row = [ods.Formula("A1"), ods.Formula("A1")]
+        xml = self.write([row, row])
+        self.assertNotIn("repeated", xml)
+
+    def test_dom_mode(self):
+        self.assertRaises(ValueError, ods.writer, io.BytesIO(), collapse_repeated=True)
+
+
+class TestWorkers(TestCase):
+    def write(self, **kwargs):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True, **kwargs) as odsfile:
+            sheets = [odsfile.new_sheet("Sheet {}".format(i), cols=4) for i in range(3)]
+            typed = odsfile.new_sheet("Typed", schema=[int, str, datetime.date])
+            row = []
+            for i in range(5000):
+                # The same list is reused, as it often is when filling rows from a cursor.
+                row[:] = [i, "Row {}".format(i // 10), None]
+                sheets[i % 3].writerow(row)
+                sheets[i % 2].writerow([i // 100])
+                typed.writerow([i, "Typed", datetime.date(2000, 1, 1 + i % 28)])
+        return content_xml(f)
+
+    def test_identical(self):
+        self.assertEqual(self.write(), self.write(workers=2))
+        self.assertEqual(self.write(collapse_repeated=True), self.write(workers=2, collapse_repeated=True))
+
+    def test_writerows(self):
+        # With workers, writerows adds rows to the batch a slice at a time.
+        def write(**kwargs):
+            f = io.BytesIO()
+            stats = ods.WriterStats()
+            with ods.writer(f, streaming=True, stats=stats, **kwargs) as odsfile:
+                sheet = odsfile.new_sheet("Rows")
+                sheet.writerow(["First"])
+                sheet.writerows([i, "Row {}".format(i)] for i in range(2500))
+                sheet.writerows([])
+                sheet.writerows([[i % 3] for i in range(1200)])
+            return content_xml(f), stats.rows
+        self.assertEqual(write(), write(workers=2))
+        self.assertEqual(write(collapse_repeated=True), write(workers=2, collapse_repeated=True))
+
+    def test_error_in_worker(self):
+        def write_bad_row():
+            with ods.writer(io.BytesIO(), streaming=True, workers=1) as odsfile:
+                odsfile.new_sheet("Short", cols=1).writerow([1, 2])
+        self.assertRaises(Exception, write_bad_row)
+
+    def test_dom_mode(self):
+        self.assertRaises(ValueError, ods.writer, io.BytesIO(), workers=2)
+
+
+class TestWriteBatch(TestCase):
+    def setUp(self):
+        self.rows = [[i, "Row {}".format(i // 3), i / 4, datetime.date(2000, 1, 1 + i % 28), None, i % 2 == 0]
+                     for i in range(250)] + [[], [0, "Last"]]
+
+    def write(self, batch, cols=None, schema=None, **kwargs):
+        f = io.BytesIO()
+        with ods.writer(f, **kwargs) as odsfile:
+            sheet = odsfile.new_sheet("First", cols=cols, schema=schema)
+            if batch:
+                sheet.write_batch((row for row in self.rows), batch_size=100)
+                odsfile.write_batch(self.rows[:10])
+            else:
+                sheet.writerows(self.rows)
+                odsfile.writerows(self.rows[:10])
+        return content_xml(f)
+
+    def test_identical(self):
+        expected = self.write(False)
+        self.assertEqual(self.write(True), expected)
+        self.assertEqual(self.write(True, streaming=True), expected)
+        self.assertEqual(self.write(True, streaming=True, cols=8), self.write(False, cols=8))
+        self.assertEqual(self.write(True, streaming=True, collapse_repeated=True),
+                         self.write(False, streaming=True, collapse_repeated=True))
+        schema = [int, str, float, datetime.date, None, bool]
+        self.assertEqual(self.write(True, streaming=True, schema=schema), expected)
+        self.assertEqual(self.write(True, streaming=True, workers=1), expected)
+
+    def test_too_many_cells(self):
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True) as odsfile:
+            sheet = odsfile.new_sheet("Short", cols=2)
+            self.assertRaises(Exception, sheet.write_batch, [[1], [1, 2, 3]])
+
+
+class WriteOnly(object):
+    """
+    Like a pipe or socket: it can't tell or seek.
+    """
+    def __init__(self):
+        self.f = io.BytesIO()
+
+    def write(self, data):
+        return self.f.write(data)
+
+    def flush(self):
+        pass
+
+
+class TestNonSeekable(TestCase):
+    def test_write_only_file(self):
+        rows = [[i, "Row {}".format(i)] for i in range(5000)]
+        expected = write(rows, streaming=True)
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            out = WriteOnly()
+            with ods.writer(out, compression, streaming=True) as odsfile:
+                odsfile.writerows(rows)
+            with zipfile.ZipFile(out.f) as zipf:
+                self.assertIsNone(zipf.testzip())
+                self.assertEqual(zipf.read("content.xml"), expected)
+
+    def test_stream(self):
+        consumed = []
+
+        def rows():
+            for i in range(100000):
+                consumed.append(i)
+                yield [i, "Row {}".format(i)]
+
+        chunks = ods.stream(rows())
+        # The start of the file is available before most of the rows have been read.
+        next(chunks)
+        next(chunks)
+        self.assertLess(len(consumed), 10000)
+        data = b"".join(chunks)
+        self.assertEqual(len(consumed), 100000)
+        self.assertGreater(len(data), 0)
+
+    def test_stream_sheets(self):
+        sheets = {"First": [[1, 2]], "Second": ([i] for i in range(3000)), "Third": []}
+        data = b"".join(ods.stream(sheets, zipfile.ZIP_DEFLATED))
+        expected = write(None, [("First", None, [[1, 2]]),
+                                ("Second", None, [[i] for i in range(3000)]),
+                                ("Third", None, [])])
+        with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+            self.assertEqual(zipf.read("content.xml"), expected)
+
+
+class TestFinish(TestCase):
+    def test_finished_sheets_are_streamed(self):
+        f = io.BytesIO()
+        odsfile = ods.writer(f, streaming=True)
+        first = odsfile.new_sheet("First")
+        second = odsfile.new_sheet("Second")
+        second.writerow(["Buffered"])
+        self.assertIsNot(second.out, odsfile.content)
+        first.finish()
+        self.assertIs(second.out, odsfile.content)
+        third = odsfile.new_sheet("Third")
+        self.assertIsNot(third.out, odsfile.content)
+        second.finish()
+        third.finish()
+        self.assertRaises(Exception, third.writerow, [1])
+        fourth = odsfile.new_sheet("Fourth")
+        self.assertIs(fourth.out, odsfile.content)
+        odsfile.close()
+        self.assertEqual(content_xml(f), write(None, [("First", None, []), ("Second", None, [["Buffered"]]),
+                                                      ("Third", None, []), ("Fourth", None, [])]))
+
+
+class TestStringCache(TestCase):
+    def tearDown(self):
+        ods.set_string_cache_size(serializer.STRING_CACHE_SIZE)
+
+    def test_identical(self):
+        rows = [["A & B", "<C>", "", "x" * 100, "A & B"]] * 3
+        expected = write(rows)
+        for size in (0, 2, 100):
+            ods.set_string_cache_size(size)
+            self.assertEqual(write(rows, streaming=True), expected)
+            self.assertLessEqual(len(serializer._string_cells), size)
+
+    def test_eviction(self):
+        ods.set_string_cache_size(3)
+        for s in ("a", "b", "c", "d"):
+            serializer.encode_cell(s)
+        self.assertEqual(list(serializer._string_cells), ["b", "c", "d"])
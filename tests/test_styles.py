@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+import io
+import zipfile
+import datetime
+from xml.dom.minidom import parseString
+
+import odswriter as ods
+from odswriter import reader, serializer
+
+
+class TestStyles(TestCase):
+    def write(self, **kwargs):
+        f = io.BytesIO()
+        with ods.writer(f, **kwargs) as odsfile:
+            bold = odsfile.add_style(bold=True, background="#ffff00")
+            money = odsfile.add_style(number_format="#,##0.00", color="#ff0000")
+            self.assertIs(odsfile.add_style(bold=True, background="#ffff00"), bold)
+            odsfile.writerow([ods.Cell("Total", bold), ods.Cell(1234.5, money), ods.Cell(None, bold)])
+            odsfile.writerow([ods.Cell(datetime.date(2020, 1, 1), bold), ods.Cell(datetime.time(13, 37), bold),
+                              ods.Cell(True, bold), ods.Cell(datetime.date(2020, 1, 1), money),
+                              ods.Cell(ods.Formula("SUM(B1:B1)"), money), ods.Cell("<&>", bold)])
+        with zipfile.ZipFile(io.BytesIO(f.getvalue())) as zipf:
+            return zipf.read("content.xml"), zipf.read("styles.xml")
+
+    def test_dom_and_streaming_match(self):
+        content, styles = self.write()
+        self.assertEqual(self.write(streaming=True), (content, styles))
+        self.assertEqual(self.write(streaming=True, collapse_repeated=True)[1], styles)
+
+    def test_styles(self):
+        content, styles = self.write()
+        content = content.decode("utf-8")
+        # The bold style and its variants for dates, times and booleans, then the money style.
+        self.assertIn('<table:table-cell office:value-type="string" table:style-name="ce1"><text:p>Total', content)
+        self.assertIn('<table:table-cell table:style-name="ce1"/>', content)
+        self.assertIn('office:date-value="2020-01-01" table:style-name="ce2"', content)
+        self.assertIn('table:style-name="ce3"><text:p>13:37:00', content)
+        self.assertIn('table:style-name="ce4"><text:p>TRUE', content)
+        self.assertIn('office:date-value="2020-01-01" table:style-name="ce5"', content)
+        self.assertIn('<table:table-cell table:formula="of:=SUM([.B1:.B1])" table:style-name="ce5"/>', content)
+
+        self.assertIn(b'xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0"', styles)
+        dom = parseString(styles)
+        names = [style.getAttribute("style:name") for style in dom.getElementsByTagName("style:style")]
+        self.assertEqual(names, ["ce1", "ce2", "ce3", "ce4", "ce5"])
+        number = dom.getElementsByTagName("number:number-style")[0]
+        self.assertEqual(number.getAttribute("style:name"), "N1")
+        self.assertEqual(number.firstChild.getAttribute("number:decimal-places"), "2")
+        self.assertEqual(number.firstChild.getAttribute("number:grouping"), "true")
+
+    def test_style_name_in_text(self):
+        # Python 3.13 doesn't escape quotes in text, so text can look like the attribute. Only the start tag is styled.
+        text = 'x table:style-name="cBool" y'
+        for streaming in (False, True):
+            f = io.BytesIO()
+            with ods.writer(f, streaming=streaming) as odsfile:
+                bold = odsfile.add_style(bold=True)
+                odsfile.writerow([ods.Cell(text, bold)])
+            self.assertEqual(list(reader.iter_rows(f)), [[text]])
+            with zipfile.ZipFile(f) as zipf:
+                self.assertIn(b'<table:table-cell office:value-type="string" table:style-name="ce1"><text:p>x',
+                              zipf.read("content.xml"))
+        part = '<table:table-cell office:value-type="string"><text:p>{}</text:p></table:table-cell>'.format(text)
+        self.assertEqual(serializer.style_cell(part, bold), part.replace('"string"', '"string" table:style-name="ce1"'))
+
+    def test_unstyled(self):
+        f = io.BytesIO()
+        with ods.writer(f) as odsfile:
+            odsfile.writerow([1])
+        with zipfile.ZipFile(f) as zipf:
+            self.assertEqual(zipf.read("styles.xml").decode("utf-8"), ods.ods_components.styles_xml)
+
+    def test_number_format(self):
+        registry = ods.StyleRegistry()
+        registry.add(number_format="0.0%")
+        self.assertIn('<number:percentage-style style:name="N1"><number:number number:decimal-places="1" '
+                      'number:min-integer-digits="1"/><number:text>%</number:text>', registry.definitions())
+        with self.assertRaises(ValueError):
+            registry.add(number_format="dd/mm/yyyy")
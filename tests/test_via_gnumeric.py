@@ -1,6 +1,8 @@
 import unittest
 
 import tempfile
+import io
+import zipfile
 import os
 import subprocess
 import csv
@@ -21,9 +23,9 @@ def command_is_executable(args):
         return False
 
 
-def launder_through_gnumeric(rows):
+def launder_through_gnumeric(rows, append=False, **kwargs):
     """
-        Saves rows into an ods, uses ssconvert (based on gnumeric) to convert to a CSV and loads
+        Saves rows into an ods (with ods.writer's kwargs, or through ods.appender if append is set), uses ssconvert (based on gnumeric) to convert to a CSV and loads
         the rows from that CSV.
     """
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -31,8 +33,16 @@ def launder_through_gnumeric(rows):
         temp_ods = os.path.join(temp_dir, "test.ods")
         temp_csv = os.path.join(temp_dir, "test.csv")
         with open(temp_ods, "wb") as temp_ods_file:
-            with ods.writer(temp_ods_file) as odsfile:
-                odsfile.writerows(rows)
+            if append:
+                # Write the first row, then add the rest with an appender.
+                source = io.BytesIO()
+                with ods.writer(source) as odsfile:
+                    odsfile.writerows(rows[:1])
+                with ods.appender(source, temp_ods_file, **kwargs) as odsfile:
+                    odsfile.writerows(rows[1:])
+            else:
+                with ods.writer(temp_ods_file, **kwargs) as odsfile:
+                    odsfile.writerows(rows)
 
         # Convert it to a CSV
         p = subprocess.Popen(["ssconvert", temp_ods, temp_csv])
@@ -127,4 +137,31 @@ class TestViaGnumeric(unittest.TestCase):
                                   "</table:table-cell>",
                                   "<br />",
                                   "&",
-                                  "&amp;"]])
\ No newline at end of file
+                                  "&amp;"]])
+
+
+MIXED_ROWS = [["String", "<&>", 1, 123.123, decimal.Decimal("10.321")],
+              ["Bool", True, False, None, datetime.date(1989, 11, 9)],
+              ["Formula", 1, 2, 3, ods.Formula("SUM(B3:D3)")]]
+
+
+@unittest.skipUnless(command_is_executable(["ssconvert", "--version"]), "ssconvert not found")
+class TestStreamedViaGnumeric(unittest.TestCase):
+    """
+        Files written without the DOM writer, whose content.xml has ZIP64 headers, must read the same.
+    """
+    def check(self, **kwargs):
+        expected = launder_through_gnumeric(MIXED_ROWS)
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(launder_through_gnumeric(MIXED_ROWS, **kwargs), expected)
+
+    def test_streaming(self):
+        self.check(streaming=True)
+
+    def test_compress_threads(self):
+        self.check(compression=zipfile.ZIP_DEFLATED, compress_threads=2)
+        self.check(compression=zipfile.ZIP_DEFLATED, compress_threads=2, streaming=True)
+
+    def test_append(self):
+        self.check(append=True)
+        self.check(append=True, compression=zipfile.ZIP_DEFLATED)
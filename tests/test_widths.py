@@ -0,0 +1,116 @@
+import unittest
+
+import io
+import re
+import decimal
+import datetime
+
+import odswriter as ods
+from odswriter import backends, reader, widths
+
+from .helpers import content_xml
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ROWS = [
+    ["Name", "A much longer heading", "x", None],
+    [1, 2.5, datetime.date(2020, 1, 1), datetime.datetime(2020, 1, 1, 12, 30)],
+    ["Two\nlines", "", None, True],
+    [decimal.Decimal("1.25"), 1 / 3.0, ods.Formula("SUM(A1:A2)"), datetime.time(13, 37)],
+]
+
+
+def write(**kwargs):
+    f = io.BytesIO()
+    with ods.writer(f, auto_width=True, **kwargs) as odsfile:
+        odsfile.new_sheet("Rows").writerows(ROWS)
+        odsfile.new_sheet("Padded", cols=6).write_batch(ROWS)
+        odsfile.new_sheet("Empty")
+        odsfile.new_sheet("Empty with cols", cols=2)
+        odsfile.new_sheet("Wide").writerow(["y" * 200])
+    return f
+
+
+class TestWidths(unittest.TestCase):
+    def test_display_length(self):
+        self.assertEqual(widths.display_length("Two\nlines"), 5)
+        self.assertEqual(widths.display_length(12345), 5)
+        self.assertEqual(widths.display_length(1 / 3.0), 12)
+        self.assertEqual(widths.display_length(decimal.Decimal("1.250")), 5)
+        self.assertEqual(widths.display_length(datetime.datetime(2020, 1, 1, 12, 30)), 10)
+        self.assertEqual(widths.display_length(False), 5)
+        self.assertEqual(widths.display_length(None), 0)
+        self.assertEqual(widths.display_length(ods.Formula("A1")), 0)
+
+    def test_runs(self):
+        column_widths = widths.ColumnWidths()
+        column_widths.add_row(["a" * 20, "b" * 20, 1])
+        column_widths.add_row([None, None, None, "c" * 20])
+        styles = widths.ColumnStyles()
+        self.assertEqual(styles.runs(column_widths), [("co1", 2), ("co2", 1), ("co1", 1)])
+        self.assertEqual(styles.runs(column_widths, cols=6), [("co1", 2), ("co2", 1), ("co1", 1), ("co2", 2)])
+        self.assertEqual(styles.runs(widths.ColumnWidths()), [])
+        self.assertEqual(len(styles.names), 2)
+
+    def test_content(self):
+        content = content_xml(write()).decode("utf-8")
+        self.assertIn('<table:table table:name="Rows" table:style-name="ta1"><table:table-column '
+                      'table:style-name="co1"/><table:table-column table:style-name="co2"/><table:table-column '
+                      'table:style-name="co1" table:number-columns-repeated="2"/><table:table-row>', content)
+        self.assertIn('<table:table table:name="Empty" table:style-name="ta1"/>', content)
+        self.assertIn('<table:table table:name="Empty with cols" table:style-name="ta1"><table:table-column '
+                      'table:style-name="co1" table:number-columns-repeated="2"/></table:table>', content)
+        column_widths = re.findall(r'style:name="(co\d+)" style:family="table-column">'
+                                   r'<style:table-column-properties style:column-width="([\d.]+)cm"/>', content)
+        self.assertEqual([name for name, _ in column_widths], ["co1", "co2", "co3"])
+        # Short columns keep the default width, and very long values don't make a column wider than the maximum.
+        self.assertEqual(column_widths[0][1], "%.3f" % widths.MIN_WIDTH)
+        self.assertEqual(column_widths[1][1], "4.450")
+        self.assertEqual(column_widths[2][1], "%.3f" % (widths.MAX_LENGTH * widths.CHAR_WIDTH + widths.PADDING))
+        self.assertEqual(list(reader.iter_rows(write(), "Padded"))[0], ROWS[0][:3])
+
+    def test_identical(self):
+        expected = content_xml(write()).decode("utf-8")
+        self.assertEqual(content_xml(write(streaming=True)).decode("utf-8"), expected)
+        self.assertEqual(content_xml(write(streaming=True, workers=1)).decode("utf-8"), expected)
+        flat = write(format="fods").getvalue().decode("utf-8")
+        self.assertIn(expected[expected.index("<office:automatic-styles>"):expected.index("</office:spreadsheet>")],
+                      flat)
+
+    @unittest.skipUnless(backends.available("lxml"), "lxml is not installed.")
+    def test_lxml(self):
+        self.assertEqual(content_xml(write(backend="lxml")).decode("utf-8"), content_xml(write()).decode("utf-8"))
+
+    @unittest.skipUnless(numpy, "NumPy is not installed.")
+    def test_columns(self):
+        columns = {"Number": numpy.array([1.5, 123456.25]), "Name": ["A", "A longer name than the rest"]}
+        content = []
+        for streaming in (False, True):
+            f = io.BytesIO()
+            with ods.writer(f, streaming=streaming, auto_width=True) as odsfile:
+                odsfile.write_frame(columns, name="Columns")
+                odsfile.new_sheet("Rows").writerows([["Number", "Name"], [1.5, "A"],
+                                                     [123456.25, "A longer name than the rest"]])
+            content.append(content_xml(f).decode("utf-8"))
+        self.assertEqual(content[0], content[1])
+        columns_sheet, rows_sheet = [sheet[:sheet.index("<table:table-row>")]
+                                     for sheet in content[0].split("<table:table ")[1:]]
+        self.assertEqual(columns_sheet.replace("Columns", "Rows"), rows_sheet)
+
+    def test_buffers_closed(self):
+        # Every sheet is buffered with auto_width, and the buffers are closed whether or not writing succeeds.
+        f = io.BytesIO()
+        with ods.writer(f, streaming=True, auto_width=True) as odsfile:
+            sheets = [odsfile.new_sheet("Rows"), odsfile.new_sheet("Empty")]
+            sheets[0].writerows(ROWS)
+        self.assertEqual([sheet.out.file.closed for sheet in sheets], [True, True])
+
+        with self.assertRaises(Exception):
+            with ods.writer(io.BytesIO(), streaming=True, auto_width=True) as odsfile:
+                # The rows of the second sheet are only read, and found to be too long, on close.
+                sheets = [odsfile.new_sheet("Rows"), odsfile.new_sheet("Short", cols=1, rows=[[1, 2]], prefetch=False)]
+                sheets[0].writerows(ROWS)
+        self.assertEqual([sheet.out.file.closed for sheet in sheets], [True, True])